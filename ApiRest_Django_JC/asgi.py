@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ApiRest_Django_JC.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from app.spotify.http import LifespanMiddleware  # noqa: E402
+
+application = LifespanMiddleware(django_application)
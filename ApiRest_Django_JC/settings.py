@@ -13,6 +13,17 @@ DEBUG = env('ENVIRONMENT') == 'development'
 ALLOWED_HOSTS = ['*']
 LOG_LEVEL = env('LOG_LEVEL', default='INFO')
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'structured': {'()': 'app.log.NonBlockingHandler'},
+    },
+    'loggers': {
+        'app': {'handlers': ['structured'], 'level': LOG_LEVEL},
+    },
+}
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -26,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.RequestTimingMiddleware',
+    'app.middleware.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,9 +76,30 @@ DATABASES = {
             'driver': 'ODBC Driver 17 for SQL Server',
             'trusted_connection': 'True',
         },
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
     }
 }
 
+# Réplicas de solo lectura: mismo servidor/credenciales que el primario salvo el host.
+DB_REPLICA_HOSTS = env.list('DB_REPLICA_HOSTS', default=[])
+for _index, _host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica{_index}'] = {**DATABASES['default'], 'HOST': _host, 'TEST': {'MIRROR': 'default'}}
+DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DB_REPLICA_MAX_LAG_SECONDS = env.float('DB_REPLICA_MAX_LAG_SECONDS', default=5.0)
+DB_REPLICA_CHECK_INTERVAL = env.float('DB_REPLICA_CHECK_INTERVAL', default=5.0)
+# Segundos de redo pendiente en la réplica (Always On); sin filas se considera al día.
+DB_REPLICA_LAG_QUERY = env(
+    'DB_REPLICA_LAG_QUERY',
+    default="SELECT COALESCE(MAX(CASE WHEN redo_rate > 0 THEN redo_queue_size * 1.0 / redo_rate ELSE 0 END), 0) "
+            "FROM sys.dm_hadr_database_replica_states WHERE is_local = 1 AND database_id = DB_ID()"
+)
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['app.db.routers.PrimaryReplicaRouter']
+
+DB_ODBC_POOLING = env.bool('DB_ODBC_POOLING', default=True)
+DB_ASYNC_POOL_SIZE = env.int('DB_ASYNC_POOL_SIZE', default=0)
+
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'app.utils.custom_exception_handler',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -74,6 +108,28 @@ REST_FRAMEWORK = {
     ],
 }
 
+if env.bool('API_FAST_JSON', default=False):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'app.api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'app.api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+SERVER_TIMING_HEADER = env.bool('SERVER_TIMING_HEADER', default=True)
+
+USERS_PAGE_SIZE = env.int('USERS_PAGE_SIZE', default=50)
+USERS_MAX_PAGE_SIZE = env.int('USERS_MAX_PAGE_SIZE', default=500)
+USER_DETAIL_CACHE_ALIAS = env('USER_DETAIL_CACHE_ALIAS', default='default')
+USER_DETAIL_CACHE_TTL = env.int('USER_DETAIL_CACHE_TTL', default=300)
+USER_IMPORT_BATCH_SIZE = env.int('USER_IMPORT_BATCH_SIZE', default=1000)
+USER_IMPORT_MAX_REPORTED_REJECTS = env.int('USER_IMPORT_MAX_REPORTED_REJECTS', default=1000)
+USER_EXPORT_CHUNK_SIZE = env.int('USER_EXPORT_CHUNK_SIZE', default=2000)
+BULK_FAVORITES_MAX_ITEMS = env.int('BULK_FAVORITES_MAX_ITEMS', default=500)
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Users & Spotify API',
     'DESCRIPTION': 'Migración de FastAPI a Django',
@@ -96,6 +152,48 @@ SPECTACULAR_SETTINGS = {
 SPOTIFY_CLIENT_ID = env('SPOTIFY_CLIENT_ID')
 SPOTIFY_CLIENT_SECRET = env('SPOTIFY_CLIENT_SECRET')
 SPOTIFY_REDIRECT_URI = env('SPOTIFY_REDIRECT_URI')
+SPOTIFY_API_BASE = env('SPOTIFY_API_BASE', default='https://api.spotify.com/v1')
+SPOTIFY_AUTH_URL = env('SPOTIFY_AUTH_URL', default='https://accounts.spotify.com/authorize')
+SPOTIFY_TOKEN_URL = env('SPOTIFY_TOKEN_URL', default='https://accounts.spotify.com/api/token')
+
+SPOTIFY_HTTP_TIMEOUT = env.float('SPOTIFY_HTTP_TIMEOUT', default=10.0)
+SPOTIFY_HTTP_MAX_CONNECTIONS = env.int('SPOTIFY_HTTP_MAX_CONNECTIONS', default=100)
+SPOTIFY_HTTP_MAX_KEEPALIVE = env.int('SPOTIFY_HTTP_MAX_KEEPALIVE', default=20)
+SPOTIFY_HTTP_KEEPALIVE_EXPIRY = env.float('SPOTIFY_HTTP_KEEPALIVE_EXPIRY', default=30.0)
+SPOTIFY_HTTP2 = env.bool('SPOTIFY_HTTP2', default=False)
+SPOTIFY_REFRESH_LEASE_SECONDS = env.int('SPOTIFY_REFRESH_LEASE_SECONDS', default=30)
+SPOTIFY_REFRESH_LOOKAHEAD_SECONDS = env.int('SPOTIFY_REFRESH_LOOKAHEAD_SECONDS', default=600)
+SPOTIFY_REFRESH_CONCURRENCY = env.int('SPOTIFY_REFRESH_CONCURRENCY', default=10)
+
+SPOTIFY_TOKEN_CACHE_ALIAS = env('SPOTIFY_TOKEN_CACHE_ALIAS', default=None)
+SPOTIFY_TOKEN_CACHE_SIZE = env.int('SPOTIFY_TOKEN_CACHE_SIZE', default=10000)
+SPOTIFY_TOKEN_CACHE_TTL = env.int('SPOTIFY_TOKEN_CACHE_TTL', default=300)
+
+SPOTIFY_SEARCH_CACHE_SIZE = env.int('SPOTIFY_SEARCH_CACHE_SIZE', default=2048)
+SPOTIFY_SEARCH_CACHE_TTL = env.int('SPOTIFY_SEARCH_CACHE_TTL', default=600)
+
+SPOTIFY_FANOUT_CONCURRENCY = env.int('SPOTIFY_FANOUT_CONCURRENCY', default=8)
+
+SPOTIFY_RATE_LIMIT_PER_SECOND = env.float('SPOTIFY_RATE_LIMIT_PER_SECOND', default=25.0)
+SPOTIFY_RATE_LIMIT_BURST = env.int('SPOTIFY_RATE_LIMIT_BURST', default=50)
+SPOTIFY_RATE_LIMIT_MAX_WAIT = env.float('SPOTIFY_RATE_LIMIT_MAX_WAIT', default=10.0)
+SPOTIFY_RATE_LIMIT_RETRIES = env.int('SPOTIFY_RATE_LIMIT_RETRIES', default=3)
+SPOTIFY_RATE_LIMIT_DEFAULT_RETRY_AFTER = env.int('SPOTIFY_RATE_LIMIT_DEFAULT_RETRY_AFTER', default=1)
+SPOTIFY_RATE_LIMIT_CACHE_ALIAS = env('SPOTIFY_RATE_LIMIT_CACHE_ALIAS', default=None)
+
+SPOTIFY_RETRY_ATTEMPTS = env.int('SPOTIFY_RETRY_ATTEMPTS', default=2)
+SPOTIFY_RETRY_BACKOFF_BASE = env.float('SPOTIFY_RETRY_BACKOFF_BASE', default=0.2)
+SPOTIFY_RETRY_BACKOFF_MAX = env.float('SPOTIFY_RETRY_BACKOFF_MAX', default=2.0)
+SPOTIFY_BREAKER_FAILURE_THRESHOLD = env.int('SPOTIFY_BREAKER_FAILURE_THRESHOLD', default=5)
+SPOTIFY_BREAKER_RESET_TIMEOUT = env.float('SPOTIFY_BREAKER_RESET_TIMEOUT', default=30.0)
+SPOTIFY_BREAKER_PROBE_TIMEOUT = env.float('SPOTIFY_BREAKER_PROBE_TIMEOUT', default=30.0)
+
+SPOTIFY_HEDGE_ENABLED = env.bool('SPOTIFY_HEDGE_ENABLED', default=False)
+SPOTIFY_HEDGE_PERCENTILE = env.float('SPOTIFY_HEDGE_PERCENTILE', default=95.0)
+SPOTIFY_HEDGE_DELAY = env.float('SPOTIFY_HEDGE_DELAY', default=0.3)
+SPOTIFY_HEDGE_MIN_DELAY = env.float('SPOTIFY_HEDGE_MIN_DELAY', default=0.05)
+SPOTIFY_HEDGE_BUDGET_RATIO = env.float('SPOTIFY_HEDGE_BUDGET_RATIO', default=0.05)
+SPOTIFY_HEDGE_BUDGET_BURST = env.int('SPOTIFY_HEDGE_BUDGET_BURST', default=10)
 
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -0,0 +1,9 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = settings.USERS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.USERS_MAX_PAGE_SIZE
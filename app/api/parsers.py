@@ -0,0 +1,19 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from app.api.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8').lower()
+        if orjson is None or encoding not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,29 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Usa orjson si está instalado y el JSONRenderer de DRF si no. Los tipos que orjson no
+    # conoce (Decimal, lazy strings, QuerySet...) pasan por el encoder de DRF.
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._encoder.default, option=ORJSON_OPTIONS)
+        # Igual que DRF: escapamos U+2028/U+2029 para que la salida sea JavaScript válido.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
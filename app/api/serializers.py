@@ -1,8 +1,17 @@
 from rest_framework import serializers
 
+from app.metrics import timed
 from app.models import User, SavedArtist, SavedTrack
 
 
+class TimedSerializerMixin:
+    # Atribuye el tiempo de to_representation a la fase "serialize" de la petición en curso.
+
+    def to_representation(self, instance):
+        with timed("serialize"):
+            return super().to_representation(instance)
+
+
 class SavedArtistSerializer(serializers.ModelSerializer):
     class Meta:
         model = SavedArtist
@@ -15,7 +24,7 @@ class SavedTrackSerializer(serializers.ModelSerializer):
         fields = ['spotify_id', 'name']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     favorite_artists = SavedArtistSerializer(many=True, read_only=True)
     favorite_tracks = SavedTrackSerializer(many=True, read_only=True)
 
@@ -24,7 +33,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'age', 'music_preferences', 'favorite_artists', 'favorite_tracks']
 
 
-class UserCreateSerializer(serializers.ModelSerializer):
+class UserCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'name', 'age', 'music_preferences']
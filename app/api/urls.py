@@ -1,11 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import users, spotify
+from .views import users, spotify, metrics
 
 router = DefaultRouter()
 router.register(r'users', users.UserViewSet, basename='user')
 
 urlpatterns = [
+    path('users/<int:pk>/favorites/artists/', users.FavoriteArtistView.as_view(), name='user-add-favorite-artist'),
+    path('users/<int:pk>/favorites/tracks/', users.FavoriteTrackView.as_view(), name='user-add-favorite-track'),
+    path('users/<int:pk>/favorites/artists/bulk/', users.BulkFavoriteArtistsView.as_view(),
+         name='user-bulk-favorite-artists'),
+    path('users/<int:pk>/favorites/tracks/bulk/', users.BulkFavoriteTracksView.as_view(),
+         name='user-bulk-favorite-tracks'),
+
+    path('users/import/', users.UserImportView.as_view(), name='user-import'),
+    path('users/export/', users.UserExportView.as_view(), name='user-export'),
+
     path('', include(router.urls)),
 
     path('users/auth/callback', users.SpotifyCallbackView.as_view(), name='spotify-callback'),
@@ -16,4 +26,6 @@ urlpatterns = [
     path('spotify/me/following', spotify.FollowTargetView.as_view(), name='follow-targets'),
     path('spotify/me/following/artists', spotify.GetFollowedArtistsView.as_view(), name='get-followed'),
     path('spotify/me/following/contains', spotify.CheckFollowingView.as_view(), name='check-following'),
+
+    path('metrics', metrics.MetricsView.as_view(), name='metrics'),
 ]
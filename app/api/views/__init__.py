@@ -1,4 +1,13 @@
-from .users import UserViewSet, SpotifyCallbackView
+from .users import (
+    UserViewSet,
+    FavoriteArtistView,
+    FavoriteTrackView,
+    BulkFavoriteArtistsView,
+    BulkFavoriteTracksView,
+    UserImportView,
+    UserExportView,
+    SpotifyCallbackView
+)
 from .spotify import (
     SpotifyAuthView,
     SearchArtistView,
@@ -7,3 +16,4 @@ from .spotify import (
     GetFollowedArtistsView,
     CheckFollowingView
 )
+from .metrics import MetricsView
@@ -0,0 +1,40 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    # APIView de DRF con handlers `async def`: bajo ASGI la vista corre en el event loop
+    # y solo la autenticación/permisos (que pueden tocar la BD) saltan a un hilo.
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        if cls.view_is_async:
+            markcoroutinefunction(view)
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = handler(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
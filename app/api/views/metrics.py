@@ -0,0 +1,14 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from app.api.permissions import HasAPIKey
+from app.metrics import registry
+from app.spotify.telemetry import telemetry
+
+
+class MetricsView(APIView):
+    permission_classes = [HasAPIKey]
+
+    def get(self, request):
+        body = registry.render_prometheus() + telemetry.render_prometheus()
+        return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,20 +1,42 @@
-from asgiref.sync import async_to_sync
+import itertools
+import json
+import logging
+from typing import Optional
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
+from app.api.views.base import AsyncAPIView
+from app.errors import ExternalAPIError
+from app.metrics import timed
 from app.services.spotify_service import SpotifyService
 from app.services.user_service import UserService
+from app.spotify.dtos import SpotifyArtistDTO, SpotifyTrackDTO
+
+logger = logging.getLogger(__name__)
+
 
+def _compact_fields(request, dto_class, default_fields):
+    # None = respuesta cruda de Spotify; lista = modo compacto con esos campos.
+    fields_param = request.query_params.get('fields')
+    if fields_param:
+        fields = [field.strip() for field in fields_param.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in dto_class.model_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+    if request.query_params.get('view') == 'compact':
+        return default_fields
+    return None
 
-class SpotifyAuthView(APIView):
 
-    def get(self, request, user_id):
-        async def _check_user():
-            return await UserService.get_user_async(user_id)
+class SpotifyAuthView(AsyncAPIView):
 
-        user = async_to_sync(_check_user)()
+    async def get(self, request, user_id):
+        user = await UserService.get_user_async(user_id)
 
         if not user:
             return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -23,51 +45,65 @@ class SpotifyAuthView(APIView):
         return redirect(url)
 
 
-class SearchArtistView(APIView):
+class SearchArtistView(AsyncAPIView):
 
-    def get(self, request):
+    async def get(self, request):
         user_id = request.query_params.get('user_id')
         q = request.query_params.get('q')
 
         if not user_id or not q:
             return Response({"detail": "Missing user_id or q"}, status=status.HTTP_400_BAD_REQUEST)
 
-        async def _search():
-            return await SpotifyService.search_artists_raw(int(user_id), q)
+        try:
+            fields = _compact_fields(request, SpotifyArtistDTO, SpotifyService.COMPACT_ARTIST_FIELDS)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        data = async_to_sync(_search)()
+        market = request.query_params.get('market')
+        data = await SpotifyService.search_artists_raw(int(user_id), q, market)
 
         if "error" in data:
             code = 401 if data["error"] == "no_valid_token" else 400
             return Response(data, status=code)
 
+        if fields is not None:
+            with timed("serialize"):
+                items = SpotifyService.compact_artists(data, fields)
+            return Response({"items": items})
         return Response(data)
 
 
-class SearchTrackView(APIView):
+class SearchTrackView(AsyncAPIView):
 
-    def get(self, request):
+    async def get(self, request):
         user_id = request.query_params.get('user_id')
         q = request.query_params.get('q')
 
         if not user_id or not q:
             return Response({"detail": "Missing user_id or q"}, status=status.HTTP_400_BAD_REQUEST)
 
-        async def _search():
-            return await SpotifyService.search_tracks_raw(int(user_id), q)
+        try:
+            fields = _compact_fields(request, SpotifyTrackDTO, SpotifyService.COMPACT_TRACK_FIELDS)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        data = async_to_sync(_search)()
+        market = request.query_params.get('market')
+        data = await SpotifyService.search_tracks_raw(int(user_id), q, market)
 
         if "error" in data:
             code = 401 if data["error"] == "no_valid_token" else 400
             return Response(data, status=code)
 
+        if fields is not None:
+            with timed("serialize"):
+                items = SpotifyService.compact_tracks(data, fields)
+            return Response({"items": items})
         return Response(data)
 
 
-class FollowTargetView(APIView):
+class FollowTargetView(AsyncAPIView):
 
-    def put(self, request):
+    async def put(self, request):
         user_id = request.query_params.get('user_id')
         target_type = request.query_params.get('type')
         ids = request.data.get('ids')
@@ -78,46 +114,106 @@ class FollowTargetView(APIView):
         if target_type not in ['artist', 'user']:
             return Response({"detail": "Invalid type"}, status=status.HTTP_400_BAD_REQUEST)
 
-        async def _follow():
-            try:
-                await SpotifyService.follow_targets(int(user_id), ids, target_type)
-                return Response({"message": f"Successfully followed {len(ids)} {target_type}(s)"})
-            except ValueError as e:
-                if str(e) == "no_valid_token":
-                    return Response(
-                        {"detail": "User not authenticated with Spotify (Requires new login for scope update)"},
-                        status=status.HTTP_401_UNAUTHORIZED)
-                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
         try:
-            return async_to_sync(_follow)()
+            await SpotifyService.follow_targets(int(user_id), ids, target_type)
+            return Response({"message": f"Successfully followed {len(ids)} {target_type}(s)"})
+        except ValueError as e:
+            if str(e) == "no_valid_token":
+                return Response(
+                    {"detail": "User not authenticated with Spotify (Requires new login for scope update)"},
+                    status=status.HTTP_401_UNAUTHORIZED)
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ExternalAPIError:
+            raise
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class GetFollowedArtistsView(APIView):
+class _FollowedArtistsEncoder:
+    # Partes del cuerpo en JSON ({"items": [...], "count": N}, la forma de la respuesta anterior)
+    # o NDJSON. El 200 ya se ha enviado al fallar una página posterior: el error va en el cuerpo.
+
+    def __init__(self, ndjson: bool):
+        self.ndjson = ndjson
+        self.count = 0
+
+    def head(self) -> str:
+        return "" if self.ndjson else '{"items": ['
+
+    def item(self, artist) -> str:
+        self.count += 1
+        if self.ndjson:
+            return json.dumps(artist) + "\n"
+        return ("," if self.count > 1 else "") + json.dumps(artist)
+
+    def tail(self, error: Optional[Exception] = None) -> str:
+        if error is None:
+            return "" if self.ndjson else f'], "count": {self.count}}}'
+        logger.error("Followed artists stream interrupted", extra={"count": self.count, "error": str(error)})
+        marker = {"error": "Stream interrupted", "message": getattr(error, "message", str(error))}
+        if self.ndjson:
+            return json.dumps({**marker, "count": self.count}) + "\n"
+        return f'], "count": {self.count}, "error": {json.dumps(marker)}}}'
 
-    def get(self, request):
+
+class GetFollowedArtistsView(AsyncAPIView):
+
+    async def get(self, request):
         user_id = request.query_params.get('user_id')
         if not user_id:
             return Response({"detail": "Missing user_id"}, status=status.HTTP_400_BAD_REQUEST)
+        user_id = int(user_id)
 
-        async def _get_artists():
-            try:
-                artists = await SpotifyService.get_my_followed_artists(int(user_id))
-                return Response({"count": len(artists), "items": artists})
-            except ValueError as e:
-                if str(e) == "no_valid_token":
-                    return Response({"detail": "User not authenticated with Spotify"},
-                                    status=status.HTTP_401_UNAUTHORIZED)
-                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Pedimos la primera página antes de empezar a emitir para poder responder 401/400.
+        try:
+            first, after = await SpotifyService.get_followed_artists_page(user_id)
+        except ValueError as e:
+            if str(e) == "no_valid_token":
+                return Response({"detail": "User not authenticated with Spotify"},
+                                status=status.HTTP_401_UNAUTHORIZED)
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        ndjson = request.query_params.get('output') == 'ndjson'
+        encoder = _FollowedArtistsEncoder(ndjson)
+        # Bajo WSGI Django acumularía un iterador async entero antes de enviarlo: allí las
+        # páginas siguientes se piden desde un iterador síncrono a medida que se emiten.
+        if isinstance(request._request, ASGIRequest):
+            rest = SpotifyService.iter_my_followed_artists(user_id, after=after) if after else None
+            body = self._astream(encoder, first, rest)
+        else:
+            rest = SpotifyService.iter_my_followed_artists_sync(user_id, after=after) if after else None
+            body = self._stream(encoder, first, rest)
+        return StreamingHttpResponse(body, content_type="application/x-ndjson" if ndjson else "application/json")
+
+    @staticmethod
+    async def _astream(encoder, first, rest):
+        yield encoder.head()
+        try:
+            for artist in first:
+                yield encoder.item(artist)
+            if rest is not None:
+                async for artist in rest:
+                    yield encoder.item(artist)
+        except Exception as e:
+            yield encoder.tail(e)
+            return
+        yield encoder.tail()
 
-        return async_to_sync(_get_artists)()
+    @staticmethod
+    def _stream(encoder, first, rest):
+        yield encoder.head()
+        try:
+            for artist in itertools.chain(first, rest or ()):
+                yield encoder.item(artist)
+        except Exception as e:
+            yield encoder.tail(e)
+            return
+        yield encoder.tail()
 
 
-class CheckFollowingView(APIView):
+class CheckFollowingView(AsyncAPIView):
 
-    def get(self, request):
+    async def get(self, request):
         user_id = request.query_params.get('user_id')
         ids_param = request.query_params.get('ids')
         target_type = request.query_params.get('type')
@@ -125,19 +221,16 @@ class CheckFollowingView(APIView):
         if not user_id or not ids_param or not target_type:
             return Response({"detail": "Missing params"}, status=status.HTTP_400_BAD_REQUEST)
 
-        id_list = [item_id.strip() for item_id in ids_param.split(",")]
-
-        async def _check():
-            try:
-                results = await SpotifyService.check_if_following(int(user_id), id_list, target_type)
-                response_data = []
-                for spotify_id, is_following in zip(id_list, results):
-                    response_data.append({"id": spotify_id, "is_following": is_following})
-                return Response(response_data)
-            except ValueError as e:
-                if str(e) == "no_valid_token":
-                    return Response({"detail": "User not authenticated with Spotify"},
-                                    status=status.HTTP_401_UNAUTHORIZED)
-                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-        return async_to_sync(_check)()
+        id_list = [item_id.strip() for item_id in ids_param.split(",") if item_id.strip()]
+
+        try:
+            results = await SpotifyService.check_if_following(int(user_id), id_list, target_type)
+            response_data = []
+            for spotify_id, is_following in zip(id_list, results):
+                response_data.append({"id": spotify_id, "is_following": is_following})
+            return Response(response_data)
+        except ValueError as e:
+            if str(e) == "no_valid_token":
+                return Response({"detail": "User not authenticated with Spotify"},
+                                status=status.HTTP_401_UNAUTHORIZED)
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
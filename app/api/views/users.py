@@ -1,26 +1,166 @@
-from asgiref.sync import async_to_sync
+import codecs
+import itertools
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from pydantic import BaseModel
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from app.api.pagination import UserCursorPagination
 from app.api.serializers import UserSerializer, UserCreateSerializer, SavedArtistSerializer, SavedTrackSerializer
+from app.api.views.base import AsyncAPIView
+from app.db.routers import pin_to_primary
+from app.errors import ExternalAPIError
 from app.models import User
 from app.services.spotify_service import SpotifyService
+from app.services.user_cache import user_detail_cache
+from app.services.user_export import UserExportService, CONTENT_TYPES as EXPORT_CONTENT_TYPES
+from app.services.user_import import UserImportService
 from app.services.user_service import UserService
 
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.prefetch_related('favorite_artists', 'favorite_tracks')
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            user_id = int(kwargs.get('pk'))
+        except (TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+
+        # Con la caché activa un acierto no toca la BD ni serializa: el payload guardado
+        # incluye ETag y Last-Modified.
+        if user_detail_cache.enabled:
+            cache_version = user_detail_cache.version(user_id)
+            entry = user_detail_cache.get(user_id, cache_version)
+            if entry is not None:
+                conditional = get_conditional_response(request, etag=entry['etag'],
+                                                       last_modified=entry['last_modified'])
+                response = conditional if conditional is not None else Response(entry['data'])
+                return self._with_validators(response, entry['etag'], entry['last_modified'])
+            # Lo que leamos se guarda bajo la versión actual: debe salir del primario, una réplica
+            # atrasada dejaría en caché datos anteriores a la escritura que subió la versión.
+            pin_to_primary()
+
+        # Comprobamos la versión con una consulta ligera antes de cargar favoritos y serializar.
+        version = User.objects.filter(pk=user_id).only('id', 'revision', 'updated_at').first()
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        last_modified = int(version.updated_at.timestamp())
+        conditional = get_conditional_response(request, etag=version.etag, last_modified=last_modified)
+        if conditional is not None:
+            return self._with_validators(conditional, version.etag, last_modified)
+
+        response = super().retrieve(request, *args, **kwargs)
+        if user_detail_cache.enabled and response.status_code == 200:
+            user_detail_cache.set(user_id, cache_version, {
+                'data': response.data,
+                'etag': version.etag,
+                'last_modified': last_modified,
+            })
+        return self._with_validators(response, version.etag, last_modified)
+
+    @staticmethod
+    def _with_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return UserCreateSerializer
         return UserSerializer
 
-    @action(detail=True, methods=['post'], url_path='favorites/artists')
-    def add_favorite_artist(self, request, pk=None):
+
+class UserImportView(APIView):
+    content_types = {
+        'application/x-ndjson': 'ndjson',
+        'application/jsonl': 'ndjson',
+        'text/csv': 'csv',
+    }
+
+    def post(self, request):
+        fmt = self.content_types.get(request.content_type.split(';')[0].strip().lower())
+        if fmt is None:
+            return Response({"error": f"Content-Type must be one of: {', '.join(self.content_types)}"},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        # Leemos el cuerpo línea a línea desde request.stream (sin pasar por request.data),
+        # así el fichero nunca se carga entero en memoria.
+        stream = request.stream
+        lines = codecs.iterdecode(stream, 'utf-8-sig') if stream is not None else iter(())
+
+        rejects = []
+
+        def on_reject(entry):
+            if len(rejects) < settings.USER_IMPORT_MAX_REPORTED_REJECTS:
+                rejects.append(entry)
+
+        try:
+            stats = UserImportService.import_rows(UserImportService.read_rows(lines, fmt), on_reject=on_reject)
+        except UnicodeDecodeError:
+            return Response({"error": "Body must be UTF-8 encoded"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({**stats, "rejects": rejects})
+
+
+def _joined_chunks(lines, size):
+    lines = iter(lines)
+    while chunk := list(itertools.islice(lines, size)):
+        yield "".join(chunk)
+
+
+async def _aiter_in_thread(chunks):
+    # Bajo ASGI Django acumularía en memoria un iterador síncrono entero antes de enviarlo.
+    # Lo consumimos bloque a bloque en el hilo thread-sensitive, donde vive el cursor.
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
+
+
+class UserExportView(APIView):
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response({"error": f"output must be one of: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {'genre': request.query_params.get('genre') or None}
+        for param in ('min_id', 'max_id'):
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                filters[param] = int(value)
+            except ValueError:
+                return Response({"error": f"{param} must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks = _joined_chunks(UserExportService.lines(output, **filters), settings.USER_EXPORT_CHUNK_SIZE)
+        if isinstance(request._request, ASGIRequest):
+            chunks = _aiter_in_thread(chunks)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="users.{output}"'
+        return response
+
+
+class FavoriteArtistView(AsyncAPIView):
+
+    async def post(self, request, pk=None):
         artist_name = request.query_params.get("artist_name")
         if not artist_name:
             return Response({"error": "Missing artist_name query param"}, status=status.HTTP_400_BAD_REQUEST)
@@ -44,16 +184,18 @@ class UserViewSet(viewsets.ModelViewSet):
             return SavedArtistSerializer(saved_artist).data
 
         try:
-            data = async_to_sync(_process)()
+            data = await _process()
             if isinstance(data, Response): return data
             return Response(data)
-        except NotFound as e:
+        except (NotFound, ExternalAPIError) as e:
             raise e
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
-    @action(detail=True, methods=['post'], url_path='favorites/tracks')
-    def add_favorite_track(self, request, pk=None):
+
+class FavoriteTrackView(AsyncAPIView):
+
+    async def post(self, request, pk=None):
         track_name = request.query_params.get("track_name")
         if not track_name:
             return Response({"error": "Missing track_name query param"}, status=status.HTTP_400_BAD_REQUEST)
@@ -77,18 +219,77 @@ class UserViewSet(viewsets.ModelViewSet):
             return SavedTrackSerializer(saved_track).data
 
         try:
-            data = async_to_sync(_process)()
+            data = await _process()
             if isinstance(data, Response): return data
             return Response(data)
-        except NotFound as e:
+        except (NotFound, ExternalAPIError) as e:
             raise e
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
 
-class SpotifyCallbackView(APIView):
+class BulkFavoritesView(AsyncAPIView):
+    # Cada subclase indica la función del servicio que resuelve en Spotify y la que guarda.
+    resolve = None
+    persist = None
 
-    def get(self, request):
+    async def post(self, request, pk=None):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Body must be a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+        names = request.data.get("names") or []
+        ids = request.data.get("ids") or []
+        if not isinstance(names, list) or not isinstance(ids, list) or not (names or ids):
+            return Response({"error": "Body must include a non-empty 'names' or 'ids' list"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_items = settings.BULK_FAVORITES_MAX_ITEMS
+        if len(names) + len(ids) > max_items:
+            return Response({"error": f"At most {max_items} items per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        user = await UserService.get_user_async(pk)
+        if not user:
+            raise NotFound(detail="User not found")
+
+        try:
+            resolved = await self.resolve(user.id, [str(n) for n in names], [str(i) for i in ids])
+        except ValueError as e:
+            if str(e) == "no_valid_token":
+                return Response({"message": "User not logged in Spotify"}, status=status.HTTP_401_UNAUTHORIZED)
+            return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        existing = await self.persist(user, [dto for _, dto in resolved if isinstance(dto, BaseModel)])
+
+        items = []
+        for item_input, outcome in resolved:
+            if isinstance(outcome, BaseModel):
+                items.append({"input": item_input, "status": "already_saved" if outcome.id in existing else "saved",
+                              "spotify_id": outcome.id, "name": outcome.name})
+            elif outcome is None:
+                items.append({"input": item_input, "status": "not_found"})
+            else:
+                items.append({"input": item_input, "status": "error", "detail": str(outcome)})
+
+        return Response({
+            "saved": sum(1 for item in items if item["status"] == "saved"),
+            "already_saved": sum(1 for item in items if item["status"] == "already_saved"),
+            "failed": sum(1 for item in items if item["status"] not in ("saved", "already_saved")),
+            "items": items,
+        })
+
+
+class BulkFavoriteArtistsView(BulkFavoritesView):
+    resolve = staticmethod(SpotifyService.resolve_artists_to_save)
+    persist = staticmethod(UserService.add_favorite_artists_bulk)
+
+
+class BulkFavoriteTracksView(BulkFavoritesView):
+    resolve = staticmethod(SpotifyService.resolve_tracks_to_save)
+    persist = staticmethod(UserService.add_favorite_tracks_bulk)
+
+
+class SpotifyCallbackView(AsyncAPIView):
+
+    async def get(self, request):
         code = request.query_params.get("code")
         error = request.query_params.get("error")
         state = request.query_params.get("state")
@@ -103,10 +304,7 @@ class SpotifyCallbackView(APIView):
         except ValueError:
             return Response({"detail": "Invalid state (user_id)"}, status=status.HTTP_400_BAD_REQUEST)
 
-        async def _process():
-            return await SpotifyService.process_auth_callback(code, user_id)
-
-        success = async_to_sync(_process)()
+        success = await SpotifyService.process_auth_callback(code, user_id)
 
         if not success:
             return Response({"detail": "Authentication failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    name = 'app'
+
+    def ready(self):
+        from app import signals  # noqa: F401
+        from app.db import configure_odbc_pooling
+        from app.metrics import install_db_wrapper
+
+        configure_odbc_pooling()
+        connection_created.connect(install_db_wrapper, dispatch_uid="app.metrics.install_db_wrapper")
@@ -0,0 +1 @@
+from .connections import database_sync_to_async, configure_odbc_pooling
@@ -0,0 +1,91 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Hilos de larga vida: cada uno conserva su conexión (hasta CONN_MAX_AGE), así que el
+    # pool de hilos actúa como pool de conexiones de tamaño DB_ASYNC_POOL_SIZE.
+    global _executor, _executor_size
+    size = settings.DB_ASYNC_POOL_SIZE
+    with _executor_lock:
+        if _executor is None or _executor_size != size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db-async")
+            _executor_size = size
+        return _executor
+
+
+def configure_odbc_pooling() -> None:
+    # Debe fijarse antes de abrir la primera conexión (AppConfig.ready).
+    try:
+        import pyodbc
+    except ImportError:
+        return
+    pyodbc.pooling = settings.DB_ODBC_POOLING
+
+
+def rearm_health_checks() -> None:
+    # Lo que hace request_started en el hilo de la petición: la siguiente consulta de cada
+    # conexión reutilizada vuelve a comprobarla (CONN_HEALTH_CHECKS). Los hilos del pool
+    # no reciben esas señales, así que se llama al empezar cada unidad de trabajo.
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.health_check_done = False
+
+
+def close_obsolete_connections() -> None:
+    # Como close_if_unusable_or_obsolete de Django, pero sin reiniciar health_check_done: en
+    # el hilo de la petición cada llamada ORM empezaría con un ping. El health check se rearma
+    # en los límites de petición (request_started/request_finished) o con rearm_health_checks.
+    # Las conexiones dentro de un atomic() no se tocan: cerrarlas rompería la transacción.
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        if conn.get_autocommit() != conn.settings_dict["AUTOCOMMIT"]:
+            conn.close()
+        elif conn.errors_occurred:
+            if conn.is_usable():
+                conn.errors_occurred = False
+            else:
+                conn.close()
+        elif conn.close_at is not None and time.monotonic() >= conn.close_at:
+            conn.close()
+
+
+def database_sync_to_async(func):
+    # sync_to_async para código ORM. Tras cada llamada cierra la conexión del hilo si ha
+    # superado CONN_MAX_AGE o quedó inutilizable tras un error.
+    @functools.wraps(func)
+    def _with_connection_hygiene(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_obsolete_connections()
+
+    @functools.wraps(func)
+    def _in_pool_thread(*args, **kwargs):
+        rearm_health_checks()
+        return _with_connection_hygiene(*args, **kwargs)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if settings.DB_ASYNC_POOL_SIZE > 0:
+            call = sync_to_async(_in_pool_thread, thread_sensitive=False, executor=_get_executor())
+        else:
+            # Modo por defecto: hilo thread-sensitive de Django (compatible con transacciones de tests).
+            call = sync_to_async(_with_connection_hygiene)
+        return await call(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,108 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from typing import Optional, Dict, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "default"
+
+
+class RoutingState:
+    # Estado por petición: en cuanto la petición escribe, sus lecturas van al primario.
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+
+
+_state: contextvars.ContextVar[Optional[RoutingState]] = contextvars.ContextVar("db_routing_state", default=None)
+
+
+def start_request_routing(pinned: bool = False) -> contextvars.Token:
+    return _state.set(RoutingState(pinned))
+
+
+def end_request_routing(token: contextvars.Token) -> None:
+    _state.reset(token)
+
+
+def pin_to_primary() -> None:
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+class ReplicaMonitor:
+    # Consulta el retraso de cada réplica como mucho cada DB_REPLICA_CHECK_INTERVAL segundos.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checks: Dict[str, Tuple[float, bool]] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._checks.clear()
+
+    def is_usable(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checks.get(alias)
+        if checked is not None and now - checked[0] < settings.DB_REPLICA_CHECK_INTERVAL:
+            return checked[1]
+
+        usable = self._probe(alias)
+        with self._lock:
+            self._checks[alias] = (now, usable)
+        return usable
+
+    def _probe(self, alias: str) -> bool:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(settings.DB_REPLICA_LAG_QUERY)
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.warning("Replica unavailable, reading from primary", extra={"alias": alias, "error": str(e)})
+            return False
+
+        lag = row[0] if row else None
+        if lag is not None and float(lag) > settings.DB_REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Replica lagging, reading from primary", extra={"alias": alias, "lag_seconds": float(lag)})
+            return False
+        return True
+
+
+replica_monitor = ReplicaMonitor()
+
+
+class PrimaryReplicaRouter:
+    # Lecturas dentro de una petición -> réplica sana; escrituras y todo lo demás -> primario.
+    # Fuera de una petición (comandos, refresher) se lee del primario: esos procesos releen
+    # lo que acaban de escribir y no hay middleware que marque sus escrituras.
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+
+        state = _state.get()
+        if state is None or state.pinned:
+            return PRIMARY
+
+        replicas = [alias for alias in settings.DB_REPLICAS if replica_monitor.is_usable(alias)]
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas contienen los mismos datos.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
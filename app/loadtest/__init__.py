@@ -0,0 +1,2 @@
+from .fake_spotify import FakeSpotifyServer, issue_token, parse_latency
+from .driver import ROUTES, run_load, seed_users, delete_users
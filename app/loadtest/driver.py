@@ -0,0 +1,128 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import httpx
+from django.conf import settings
+from django.utils import timezone
+
+from app.models import User, SpotifyCredentials
+from .fake_spotify import issue_token
+
+LOADTEST_USER_NAME = "Loadtest User"
+QUERIES = ["rock", "jazz", "indie", "metal", "pop", "blues", "techno", "folk"]
+
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+def _search(kind: str) -> Callable[[int, int], RequestSpec]:
+    return lambda user_id, i: ("GET", f"/spotify/search/{kind}",
+                               {"params": {"user_id": user_id, "q": QUERIES[i % len(QUERIES)]}})
+
+
+ROUTES: Dict[str, Callable[[int, int], RequestSpec]] = {
+    "search-artist": _search("artist"),
+    "search-track": _search("track"),
+    "followed-artists": lambda user_id, i: ("GET", "/spotify/me/following/artists", {"params": {"user_id": user_id}}),
+    "check-following": lambda user_id, i: ("GET", "/spotify/me/following/contains", {"params": {
+        "user_id": user_id, "type": "artist", "ids": ",".join(f"artist{i}x{n}" for n in range(20))}}),
+    "follow": lambda user_id, i: ("PUT", "/spotify/me/following", {
+        "params": {"user_id": user_id, "type": "artist"}, "json": {"ids": [f"artist{i}"]}}),
+    "user-detail": lambda user_id, i: ("GET", f"/users/{user_id}/", {}),
+    "user-list": lambda user_id, i: ("GET", "/users/", {}),
+}
+
+
+def seed_users(count: int, token_ttl: int) -> List[int]:
+    # Usuarios con credenciales emitidas por el fake; token_ttl corto fuerza el camino de refresco.
+    user_ids = []
+    for n in range(count):
+        user = User(name=f"{LOADTEST_USER_NAME} {n}", age=30, music_preferences=["Rock"])
+        user.save()
+        token = issue_token(max(token_ttl, 1))
+        SpotifyCredentials.objects.create(
+            user=user,
+            access_token=token["access_token"],
+            refresh_token=token["refresh_token"],
+            token_type=token["token_type"],
+            expires_in=token_ttl,
+            expires_at=timezone.now() + timezone.timedelta(seconds=token_ttl),
+            scope=token["scope"],
+        )
+        user_ids.append(user.id)
+    return user_ids
+
+
+def delete_users(user_ids: List[int]) -> None:
+    User.objects.filter(id__in=user_ids).delete()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Percentil por rango más cercano (nearest-rank).
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> List[Dict[str, Any]]:
+    rows = []
+    for route in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(route, []))
+        count = len(values)
+        rows.append({
+            "route": route,
+            "requests": count,
+            "errors": errors.get(route, 0),
+            "rps": count / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        })
+    return rows
+
+
+async def run_load(app, routes: List[str], user_ids: List[int], total_requests: int,
+                   concurrency: int, timeout: Optional[float] = 30.0) -> Dict[str, Any]:
+    # La app se ejecuta en el mismo proceso bajo ASGI (httpx.ASGITransport): se mide el
+    # stack completo (middleware, vistas async, pool hacia Spotify) sin un servidor delante.
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    statuses: Dict[Tuple[str, int], int] = defaultdict(int)
+    plan = itertools.islice(itertools.cycle(routes), total_requests)
+    counter = itertools.count()
+    headers = {"x-api-key": settings.SECRET_KEY}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", headers=headers,
+                                 timeout=timeout) as client:
+
+        async def worker():
+            for route in plan:
+                i = next(counter)
+                method, url, kwargs = ROUTES[route](user_ids[i % len(user_ids)], i)
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(method, url, **kwargs)
+                except Exception:
+                    errors[route] += 1
+                    continue
+                latencies[route].append(time.perf_counter() - started)
+                statuses[(route, resp.status_code)] += 1
+                if resp.status_code >= 400:
+                    errors[route] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "elapsed": elapsed,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "routes": summarize(latencies, errors, elapsed),
+        "statuses": dict(statuses),
+    }
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FOLLOWED_ARTISTS_DEFAULT = 120
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    # Formatos (milisegundos): "none", "fixed:40", "uniform:20:80", "lognormal:40:0.5" (mediana, sigma).
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(":")] if args else []
+        if kind in ("", "none"):
+            return lambda rng: 0.0
+        if kind == "fixed":
+            ms, = values
+            return lambda rng: ms / 1000
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high) / 1000
+        if kind == "lognormal":
+            median, sigma = values
+            mu = math.log(median)
+            return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec '{spec}'; use none, fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+
+
+def issue_token(ttl: int) -> Dict[str, Any]:
+    # El token lleva su caducidad dentro: cualquier proceso puede validarlo sin estado compartido.
+    expires_at = int(time.time()) + ttl
+    return {
+        "access_token": f"fake.{expires_at}.{uuid.uuid4().hex}",
+        "token_type": "Bearer",
+        "expires_in": ttl,
+        "refresh_token": f"fake-refresh.{uuid.uuid4().hex}",
+        "scope": "user-read-private user-read-email user-follow-read user-follow-modify",
+    }
+
+
+def token_is_valid(token: str) -> bool:
+    parts = token.split(".")
+    if len(parts) != 3 or parts[0] != "fake":
+        return False
+    try:
+        return int(parts[1]) > time.time()
+    except ValueError:
+        return False
+
+
+def _fake_id(prefix: str, seed: str) -> str:
+    return (prefix + hashlib.sha1(seed.encode()).hexdigest())[:22]
+
+
+def _simplified_artist(artist_id: str, name: str) -> Dict[str, Any]:
+    # Forma "simplified artist" de Spotify, la que va anidada en las canciones.
+    return {
+        "id": artist_id,
+        "name": name,
+        "type": "artist",
+        "uri": f"spotify:artist:{artist_id}",
+        "href": f"https://api.spotify.com/v1/artists/{artist_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+    }
+
+
+def _artist(artist_id: str, name: str) -> Dict[str, Any]:
+    return {
+        **_simplified_artist(artist_id, name),
+        "followers": {"href": None, "total": int(artist_id[-4:], 16) * 10},
+        "genres": ["rock", "indie"],
+        "images": [{"url": f"https://i.scdn.co/image/{artist_id}", "height": 640, "width": 640}],
+        "popularity": int(artist_id[-2:], 16) % 100,
+    }
+
+
+def _track(track_id: str, name: str) -> Dict[str, Any]:
+    artist_id = _fake_id("ar", track_id)
+    return {
+        "id": track_id,
+        "name": name,
+        "type": "track",
+        "uri": f"spotify:track:{track_id}",
+        "href": f"https://api.spotify.com/v1/tracks/{track_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "album": {"id": _fake_id("al", track_id), "name": f"{name} (Album)", "images": []},
+        "artists": [_simplified_artist(artist_id, f"Artist {artist_id[-4:]}")],
+        "duration_ms": 180000 + int(track_id[-4:], 16),
+        "explicit": False,
+        "popularity": int(track_id[-2:], 16) % 100,
+        "preview_url": None,
+    }
+
+
+class _FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeSpotifyServer"
+
+    def log_message(self, format, *args):
+        logger.debug("fake spotify: " + format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        parsed = urllib.parse.urlsplit(self.path)
+        params = {k: v[-1] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        route = f"{method} {parsed.path}"
+
+        status, payload, headers = self.server.dispatch(method, parsed.path, params, body,
+                                                        self.headers.get("Authorization", ""))
+        self.server.record(route, status)
+
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    # Imita /v1/search, /v1/me/following(/contains), /v1/artists, /v1/tracks y /api/token.
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "none",
+                 rate_429: float = 0.0, rate_5xx: float = 0.0, retry_after: int = 1,
+                 token_ttl: int = 3600, followed_count: int = FOLLOWED_ARTISTS_DEFAULT,
+                 seed: Optional[int] = None):
+        super().__init__((host, port), _FakeSpotifyHandler)
+        self.latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.followed = sorted(_fake_id("fw", str(i)) for i in range(followed_count))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.base_url}/v1"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.base_url}/api/token"
+
+    def start(self) -> "FakeSpotifyServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-spotify", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def record(self, route: str, status: int) -> None:
+        with self._lock:
+            self._stats[(route, status)] += 1
+
+    def stats(self) -> Dict[Tuple[str, int], int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _draw(self) -> Tuple[float, float]:
+        with self._lock:
+            return self.latency(self._rng), self._rng.random()
+
+    def dispatch(self, method: str, path: str, params: Dict[str, str], body: bytes,
+                 authorization: str) -> Tuple[int, Any, Dict[str, str]]:
+        delay, roll = self._draw()
+        if delay:
+            time.sleep(delay)
+
+        if method == "POST" and path == "/api/token":
+            return self._token(body)
+
+        if roll < self.rate_429:
+            return 429, {"error": {"status": 429, "message": "API rate limit exceeded"}}, {
+                "Retry-After": str(self.retry_after)}
+        if roll < self.rate_429 + self.rate_5xx:
+            return 503, {"error": {"status": 503, "message": "Service unavailable"}}, {}
+
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else ""
+        if not token_is_valid(token):
+            return 401, {"error": {"status": 401, "message": "The access token expired"}}, {}
+
+        if method == "GET" and path == "/v1/search":
+            return self._search(params)
+        if method == "GET" and path == "/v1/me/following":
+            return self._following(params)
+        if method == "PUT" and path == "/v1/me/following":
+            return 204, None, {}
+        if method == "GET" and path == "/v1/me/following/contains":
+            ids = [i for i in params.get("ids", "").split(",") if i]
+            return 200, [i in self.followed or int(hashlib.sha1(i.encode()).hexdigest(), 16) % 2 == 0
+                         for i in ids], {}
+        if method == "GET" and path in ("/v1/artists", "/v1/tracks"):
+            ids = [i for i in params.get("ids", "").split(",") if i]
+            if path == "/v1/artists":
+                return 200, {"artists": [_artist(i, f"Artist {i[-4:]}") for i in ids]}, {}
+            return 200, {"tracks": [_track(i, f"Track {i[-4:]}") for i in ids]}, {}
+
+        return 404, {"error": {"status": 404, "message": "Service not found"}}, {}
+
+    def _token(self, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        form = {k: v[-1] for k, v in urllib.parse.parse_qs(body.decode()).items()}
+        grant = form.get("grant_type")
+        if grant not in ("authorization_code", "refresh_token"):
+            return 400, {"error": "unsupported_grant_type"}, {}
+        token = issue_token(self.token_ttl)
+        if grant == "refresh_token":
+            # Como Spotify, el refresh no siempre devuelve un refresh token nuevo.
+            token.pop("refresh_token")
+        return 200, token, {}
+
+    def _search(self, params: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        q = params.get("q", "")
+        type_ = params.get("type", "artist")
+        limit = min(int(params.get("limit", 20)), 50)
+        offset = int(params.get("offset", 0))
+        if type_ == "track":
+            items: List[Dict[str, Any]] = [
+                _track(_fake_id("tr", f"{q}:{i}"), f"{q.title()} {i}") for i in range(offset, offset + limit)]
+        else:
+            items = [_artist(_fake_id("ar", f"{q}:{i}"), f"{q.title()} {i}") for i in range(offset, offset + limit)]
+        return 200, {f"{type_}s": {"items": items, "limit": limit, "offset": offset, "total": 1000,
+                                   "next": None, "previous": None}}, {}
+
+    def _following(self, params: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        limit = min(int(params.get("limit", 20)), 50)
+        after = params.get("after")
+        start = self.followed.index(after) + 1 if after in self.followed else 0
+        page = self.followed[start:start + limit]
+        has_more = start + limit < len(self.followed)
+        cursor = page[-1] if page and has_more else None
+        return 200, {"artists": {
+            "items": [_artist(i, f"Followed {i[-4:]}") for i in page],
+            "limit": limit,
+            "total": len(self.followed),
+            "cursors": {"after": cursor},
+            "next": f"{self.api_base}/me/following?type=artist&after={cursor}&limit={limit}" if cursor else None,
+        }}, {}
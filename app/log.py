@@ -0,0 +1,59 @@
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Atributos estándar de LogRecord; el resto llega vía `extra=` y se emite como campos.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class StructuredFormatter(logging.Formatter):
+    # Una línea JSON por evento: {"ts", "level", "logger", "event", ...campos de extra}.
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class NonBlockingHandler(QueueHandler):
+    # El hilo que loguea solo encola; un QueueListener escribe a stderr en segundo plano.
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(queue.SimpleQueue())
+        self.setLevel(level)
+        target = logging.StreamHandler()
+        target.setFormatter(StructuredFormatter())
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        self._listening = True
+
+    def close(self):
+        # logging.shutdown() cierra los handlers al salir: vaciamos la cola antes de terminar.
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+        super().close()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A diferencia de QueueHandler.prepare no aplanamos el mensaje: el formateo
+        # estructurado ocurre en el hilo del listener. Solo se resuelven args y traceback.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services.user_export import FORMATS, UserExportService
+
+
+class Command(BaseCommand):
+    help = "Stream every user with their favorite artists and tracks as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="File to write (default: standard output)")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Output format (default: inferred from --output, ndjson otherwise)")
+        parser.add_argument('--min-id', type=int, help="Only users with id >= MIN_ID")
+        parser.add_argument('--max-id', type=int, help="Only users with id <= MAX_ID")
+        parser.add_argument('--genre', help="Only users with this genre in music_preferences (case-insensitive)")
+        parser.add_argument('--chunk-size', type=int, default=settings.USER_EXPORT_CHUNK_SIZE,
+                            help="Users fetched (and favorites prefetched) per database round trip")
+
+    def handle(self, *args, **options):
+        path = options['output']
+        fmt = options['format'] or ('csv' if path and path.lower().endswith('.csv') else 'ndjson')
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be positive")
+
+        lines = UserExportService.lines(
+            fmt, min_id=options['min_id'], max_id=options['max_id'], genre=options['genre'],
+            chunk_size=options['chunk_size'],
+        )
+        if not path:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        try:
+            target = open(path, 'w', encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(f"Cannot open {path}: {e}")
+        with target:
+            target.writelines(lines)
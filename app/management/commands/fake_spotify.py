@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from app.loadtest import FakeSpotifyServer
+
+
+def add_fake_spotify_arguments(parser):
+    parser.add_argument('--latency', default='none',
+                        help="Latency per call in ms: none, fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Fraction of API calls answered with 429")
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help="Fraction of API calls answered with 503")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument('--token-ttl', type=int, default=3600, help="expires_in of the tokens issued by /api/token")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for latency and fault injection")
+
+
+def build_fake_spotify(options, host: str = "127.0.0.1", port: int = 0) -> FakeSpotifyServer:
+    return FakeSpotifyServer(
+        host=host,
+        port=port,
+        latency=options['latency'],
+        rate_429=options['rate_429'],
+        rate_5xx=options['rate_5xx'],
+        retry_after=options['retry_after'],
+        token_ttl=options['token_ttl'],
+        seed=options['seed'],
+    )
+
+
+class Command(BaseCommand):
+    help = "Run a local fake Spotify API for load tests (point SPOTIFY_API_BASE/SPOTIFY_TOKEN_URL at it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8888)
+        add_fake_spotify_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = build_fake_spotify(options, options['host'], options['port'])
+        self.stdout.write(f"SPOTIFY_API_BASE={server.api_base}")
+        self.stdout.write(f"SPOTIFY_TOKEN_URL={server.token_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,46 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services.user_import import FORMATS, UserImportService
+
+
+class Command(BaseCommand):
+    help = "Bulk-import users from an NDJSON or CSV file, writing rejected rows to a report"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import ('-' reads standard input)")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Input format (default: inferred from the extension, ndjson otherwise)")
+        parser.add_argument('--batch-size', type=int, default=settings.USER_IMPORT_BATCH_SIZE,
+                            help="Users validated and inserted per bulk_create")
+        parser.add_argument('--rejects', help="Write rejected rows as NDJSON to this file (default: stderr)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive")
+
+        try:
+            source = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f"Cannot open {path}: {e}")
+        report = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else self.stderr
+
+        def on_reject(entry):
+            report.write(json.dumps(entry, default=str, ensure_ascii=False) + "\n")
+
+        try:
+            stats = UserImportService.import_rows(
+                UserImportService.read_rows(source, fmt), options['batch_size'], on_reject
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if report is not self.stderr:
+                report.close()
+
+        self.stdout.write(f"received={stats['received']} created={stats['created']} rejected={stats['rejected']}")
@@ -0,0 +1,65 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.loadtest import ROUTES, run_load, seed_users, delete_users
+from .fake_spotify import add_fake_spotify_arguments, build_fake_spotify
+
+DEFAULT_ROUTES = "search-artist,search-track,followed-artists,check-following,user-detail"
+
+
+class Command(BaseCommand):
+    help = "Drive load against the API under ASGI and report throughput and p50/p95/p99 per route"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', default=DEFAULT_ROUTES,
+                            help=f"Comma-separated routes to exercise: {', '.join(ROUTES)}")
+        parser.add_argument('--requests', type=int, default=1000, help="Total requests to send")
+        parser.add_argument('--concurrency', type=int, default=20, help="Simultaneous in-flight requests")
+        parser.add_argument('--users', type=int, default=10, help="Users seeded with fake Spotify credentials")
+        parser.add_argument('--user-token-ttl', type=int, default=3600,
+                            help="Seconds until the seeded tokens expire (small values exercise refreshes)")
+        parser.add_argument('--fake-spotify', action='store_true',
+                            help="Start the fake Spotify API in-process and point the client at it")
+        parser.add_argument('--keep-data', action='store_true', help="Do not delete the seeded users afterwards")
+        add_fake_spotify_arguments(parser)
+
+    def handle(self, *args, **options):
+        routes = [r.strip() for r in options['routes'].split(",") if r.strip()]
+        unknown = [r for r in routes if r not in ROUTES]
+        if unknown or not routes:
+            raise CommandError(f"Unknown routes: {', '.join(unknown) or '(none)'}")
+
+        server = None
+        if options['fake_spotify']:
+            server = build_fake_spotify(options).start()
+            settings.SPOTIFY_API_BASE = server.api_base
+            settings.SPOTIFY_TOKEN_URL = server.token_url
+        self.stdout.write(f"Spotify API: {settings.SPOTIFY_API_BASE}")
+
+        from ApiRest_Django_JC.asgi import application
+
+        user_ids = seed_users(options['users'], options['user_token_ttl'])
+        try:
+            result = asyncio.run(run_load(application, routes, user_ids, options['requests'], options['concurrency']))
+        finally:
+            if not options['keep_data']:
+                delete_users(user_ids)
+            if server is not None:
+                server.stop()
+
+        self._report(result, server)
+
+    def _report(self, result, server):
+        self.stdout.write(f"\n{result['elapsed']:.2f}s, {result['throughput']:.1f} req/s\n")
+        self.stdout.write(f"{'route':<20}{'reqs':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for row in result['routes']:
+            self.stdout.write(
+                f"{row['route']:<20}{row['requests']:>8}{row['errors']:>8}{row['rps']:>10.1f}"
+                f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            )
+        if server is not None:
+            self.stdout.write("\nUpstream calls:")
+            for (route, status), count in sorted(server.stats().items()):
+                self.stdout.write(f"  {route} {status}: {count}")
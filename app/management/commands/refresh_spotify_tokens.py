@@ -0,0 +1,34 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.spotify.refresher import refresh_expiring_credentials
+
+
+class Command(BaseCommand):
+    help = "Refresh Spotify access tokens that expire within the look-ahead window"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookahead', type=int, default=settings.SPOTIFY_REFRESH_LOOKAHEAD_SECONDS,
+                            help="Refresh tokens expiring within this many seconds")
+        parser.add_argument('--concurrency', type=int, default=settings.SPOTIFY_REFRESH_CONCURRENCY,
+                            help="Maximum simultaneous refresh calls to Spotify")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Credentials leased and written back per batch")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and rescan every N seconds (0 runs once)")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = async_to_sync(refresh_expiring_credentials)(
+                options['lookahead'], options['concurrency'], options['batch_size']
+            )
+            self.stdout.write(
+                f"candidates={stats['candidates']} refreshed={stats['refreshed']} "
+                f"failed={stats['failed']} skipped={stats['skipped']}"
+            )
+            if options['interval'] <= 0:
+                return
+            time.sleep(options['interval'])
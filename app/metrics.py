@@ -0,0 +1,194 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Tuple
+
+PHASES = ("db", "spotify", "serialize", "render")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    # Tiempos acumulados de una petición. Se comparte por referencia entre hilos
+    # (sync_to_async) y tareas (gather) a través de la contextvar.
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.counts: Dict[str, int] = dict.fromkeys(PHASES, 0)
+        self.active: set = set()
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, duration: float) -> None:
+        with self._lock:
+            self.durations[phase] += duration
+            self.counts[phase] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for phase in PHASES:
+            if self.counts[phase]:
+                part = f"{phase};dur={self.durations[phase] * 1000:.1f}"
+                if phase in ("db", "spotify"):
+                    part += f';desc="{self.counts[phase]} {"queries" if phase == "db" else "calls"}"'
+                parts.append(part)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request() -> Tuple[RequestTimings, contextvars.Token]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record(phase: str, duration: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(phase, duration)
+
+
+@contextmanager
+def timed(phase: str):
+    # Reentrante por fase: serializers anidados no cuentan su tiempo dos veces.
+    timings = _current.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+    timings.active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(phase)
+        timings.add(phase, time.perf_counter() - started)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", time.perf_counter() - started)
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    # Receptor de connection_created; la lista de wrappers sobrevive a reconexiones.
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+class Histogram:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((_format_value(bound), total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{value:.1f}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+def histogram_lines(name: str, histogram: Histogram, **labels) -> List[str]:
+    lines = [f"{name}_bucket{{{format_labels(**labels, le=bound)}}} {count}" for bound, count in histogram.cumulative()]
+    lines.append(f"{name}_sum{{{format_labels(**labels)}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{format_labels(**labels)}}} {histogram.count}")
+    return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._durations: Dict[Tuple[str, str], Histogram] = {}
+            self._requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+            self._phase_seconds: Dict[Tuple[str, str, str], float] = defaultdict(float)
+            self._db_queries: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def observe_request(self, route: str, method: str, status: int, duration: float,
+                        timings: Optional[RequestTimings] = None) -> None:
+        with self._lock:
+            histogram = self._durations.get((route, method))
+            if histogram is None:
+                histogram = self._durations[(route, method)] = Histogram(self.buckets)
+            histogram.observe(duration)
+            self._requests[(route, method, status)] += 1
+            if timings is not None:
+                for phase in PHASES:
+                    self._phase_seconds[(route, method, phase)] += timings.durations[phase]
+                self._db_queries[(route, method)] += timings.counts["db"]
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_request_duration_seconds Wall time per request.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (route, method), histogram in sorted(self._durations.items()):
+                lines += histogram_lines("http_request_duration_seconds", histogram, route=route, method=method)
+
+            lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (route, method, status), count in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{{{format_labels(route=route, method=method, status=status)}}} {count}")
+
+            lines += ["# HELP http_request_phase_seconds_total Time spent per phase (db, spotify, serialize, render).",
+                      "# TYPE http_request_phase_seconds_total counter"]
+            for (route, method, phase), seconds in sorted(self._phase_seconds.items()):
+                lines.append(f"http_request_phase_seconds_total{{{format_labels(route=route, method=method, phase=phase)}}} {seconds}")
+
+            lines += ["# HELP http_request_db_queries_total Database queries issued.",
+                      "# TYPE http_request_db_queries_total counter"]
+            for (route, method), count in sorted(self._db_queries.items()):
+                lines.append(f"http_request_db_queries_total{{{format_labels(route=route, method=method)}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
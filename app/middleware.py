@@ -0,0 +1,87 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from app import metrics
+from app.db import routers
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class RequestTimingMiddleware:
+    # Reparte el tiempo de cada petición entre BD, Spotify, serialización y render,
+    # lo devuelve en la cabecera Server-Timing y lo acumula para /metrics.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        # Las Response de DRF se renderizan justo después de este hook.
+        timings = metrics.current_timings()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda r: timings.add("render", time.perf_counter() - started))
+        return response
+
+    def _finish(self, request, response, timings):
+        total = timings.elapsed()
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name or match.route) if match is not None else "unmatched"
+        metrics.registry.observe_request(route, request.method, response.status_code, total, timings)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+
+class ReadYourWritesMiddleware:
+    # Abre el estado de enrutado de la petición: las peticiones de solo lectura leen de réplicas
+    # hasta su primera escritura. PUT/PATCH/DELETE... leen del primario desde el principio: el
+    # objeto que van a guardar no puede venir de una réplica con datos atrasados.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = routers.start_request_routing(pinned=request.method not in SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            routers.end_request_routing(token)
+
+    async def __acall__(self, request):
+        token = routers.start_request_routing(pinned=request.method not in SAFE_METHODS)
+        try:
+            return await self.get_response(request)
+        finally:
+            routers.end_request_routing(token)
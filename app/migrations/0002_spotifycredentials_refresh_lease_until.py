@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spotifycredentials',
+            name='refresh_lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_spotifycredentials_refresh_lease_until'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='spotifycredentials',
+            index=models.Index(fields=['expires_at'], name='ix_creds_expires_at'),
+        ),
+    ]
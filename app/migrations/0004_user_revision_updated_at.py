@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_spotifycredentials_ix_creds_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every change to the user or its favorites'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Last change to the user or its favorites'),
+        ),
+    ]
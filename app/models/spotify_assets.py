@@ -17,9 +17,13 @@ class SpotifyCredentials(models.Model):
     expires_in = models.IntegerField()
     expires_at = models.DateTimeField()
     scope = models.TextField()
+    refresh_lease_until = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "spotify_credentials"
+        indexes = [
+            models.Index(fields=['expires_at'], name='ix_creds_expires_at')
+        ]
 
     def is_expired(self, margin_seconds: int = 60) -> bool:
         return timezone.now().timestamp() > (self.expires_at.timestamp() - margin_seconds)
@@ -1,6 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
+from django.utils import timezone
 
 
 class User(models.Model):
@@ -19,6 +20,16 @@ class User(models.Model):
         help_text="List of preferred genres"
     )
 
+    revision = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented on every change to the user or its favorites"
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Last change to the user or its favorites"
+    )
+
     class Meta:
         db_table = "users"
         constraints = [
@@ -50,7 +61,26 @@ class User(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        if self._state.adding:
+            self.revision = 1
+            super().save(*args, **kwargs)
+            return
+
+        # Incremento en la BD: un valor calculado en Python pisaría los bump_revision concurrentes
+        # y podría repetir una revisión (y su ETag) con otro contenido.
+        self.revision = F('revision') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'revision'}
         super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['revision'])
+
+    @classmethod
+    def bump_revision(cls, user_id: int):
+        cls.objects.filter(pk=user_id).update(revision=F('revision') + 1, updated_at=timezone.now())
+
+    @property
+    def etag(self) -> str:
+        return f'"user-{self.pk}-r{self.revision}"'
 
     def __str__(self):
         return f"<User id={self.id} name={self.name!r}>"
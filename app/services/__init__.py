@@ -1,2 +1,4 @@
 from .spotify_service import SpotifyService
 from .user_service import UserService
+from .user_export import UserExportService
+from .user_import import UserImportService
@@ -1,12 +1,23 @@
+import asyncio
+from typing import Optional, List, Tuple, Any, AsyncIterator, Dict, Iterator
+
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from asgiref.sync import sync_to_async
+from pydantic import ValidationError
 
+from app.db import database_sync_to_async
 from app.models import User, SpotifyCredentials
 from app.spotify import auth, client
+from app.spotify.cache import token_cache
+from app.spotify.dtos import SpotifyArtistDTO, SpotifyTrackDTO, ArtistListAdapter, TrackListAdapter
 
 
 class SpotifyService:
+    COMPACT_ARTIST_FIELDS = ['id', 'name', 'popularity', 'genres', 'uri']
+    COMPACT_TRACK_FIELDS = ['id', 'name', 'duration_ms', 'explicit', 'album_name', 'artists', 'uri']
 
     @staticmethod
     def get_login_url(user_id: int) -> str:
@@ -18,7 +29,7 @@ class SpotifyService:
         if not token_dto:
             return False
 
-        @sync_to_async
+        @database_sync_to_async
         def save_token():
             user = get_object_or_404(User, pk=user_id)
             expires_at = timezone.now() + timezone.timedelta(seconds=token_dto.expires_in)
@@ -36,15 +47,26 @@ class SpotifyService:
             )
 
         await save_token()
+        await token_cache.ainvalidate(user_id)
         return True
 
     @staticmethod
-    async def search_artists_raw(user_id: int, q: str):
-        return await client.search_artist(user_id, q)
+    async def search_artists_raw(user_id: int, q: str, market: Optional[str] = None):
+        return await client.search_artist(user_id, q, market=market)
 
     @staticmethod
-    async def search_tracks_raw(user_id: int, q: str):
-        return await client.search_track(user_id, q)
+    async def search_tracks_raw(user_id: int, q: str, market: Optional[str] = None):
+        return await client.search_track(user_id, q, market=market)
+
+    @staticmethod
+    def compact_artists(data: Dict[str, Any], fields: List[str]) -> List[Dict[str, Any]]:
+        artists = ArtistListAdapter.validate_python(data.get("artists", {}).get("items", []))
+        return [artist.model_dump(include=set(fields)) for artist in artists]
+
+    @staticmethod
+    def compact_tracks(data: Dict[str, Any], fields: List[str]) -> List[Dict[str, Any]]:
+        tracks = TrackListAdapter.validate_python(data.get("tracks", {}).get("items", []))
+        return [track.model_dump(include=set(fields)) for track in tracks]
 
     @staticmethod
     async def follow_targets(user_id: int, ids: list, target_type: str):
@@ -60,9 +82,44 @@ class SpotifyService:
             raise ValueError(data["error"])
         return data.get("artists", {}).get("items", [])
 
+    @staticmethod
+    async def get_followed_artists_page(user_id: int, page_size: int = 50,
+                                        after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Una página de seguidos y el cursor de la siguiente (None si es la última).
+        data = await client.get_followed_artists(user_id, limit=page_size, after=after)
+        if "error" in data:
+            raise ValueError(data["error"])
+
+        page = data.get("artists", {})
+        after = (page.get("cursors") or {}).get("after")
+        return page.get("items", []), after if after and page.get("next") else None
+
+    @staticmethod
+    async def iter_my_followed_artists(user_id: int, page_size: int = 50,
+                                       after: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            items, after = await SpotifyService.get_followed_artists_page(user_id, page_size, after)
+            for item in items:
+                yield item
+            if after is None:
+                return
+
+    @staticmethod
+    def iter_my_followed_artists_sync(user_id: int, page_size: int = 50,
+                                      after: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        # Versión para WSGI: cada página se pide con su propio async_to_sync mientras se emite.
+        while True:
+            items, after = async_to_sync(SpotifyService.get_followed_artists_page)(user_id, page_size, after)
+            yield from items
+            if after is None:
+                return
+
     @staticmethod
     async def check_if_following(user_id: int, ids: list, target_type: str):
-        return await client.check_following_status(user_id, ids, target_type)
+        result = await client.check_following_status(user_id, ids, target_type)
+        if isinstance(result, dict) and "error" in result:
+            raise ValueError(result["error"])
+        return result
 
     @staticmethod
     async def find_artist_to_save(user_id: int, artist_name: str):
@@ -75,6 +132,71 @@ class SpotifyService:
             return None
 
         item = items[0]
-
-        from app.spotify.dtos import SpotifyArtistDTO
         return SpotifyArtistDTO(**item)
+
+    @staticmethod
+    async def find_track_to_save(user_id: int, track_name: str):
+        data = await client.search_track(user_id, track_name, limit=1)
+        if "error" in data:
+            raise ValueError(data["error"])
+
+        items = data.get("tracks", {}).get("items", [])
+        if not items:
+            return None
+
+        item = items[0]
+        return SpotifyTrackDTO(**item)
+
+    @staticmethod
+    async def resolve_artists_to_save(user_id: int, names: List[str], ids: List[str]) -> List[Tuple[str, Any]]:
+        return await SpotifyService._resolve_many(
+            user_id, names, ids, SpotifyService.find_artist_to_save, client.get_artists, "artists", SpotifyArtistDTO
+        )
+
+    @staticmethod
+    async def resolve_tracks_to_save(user_id: int, names: List[str], ids: List[str]) -> List[Tuple[str, Any]]:
+        return await SpotifyService._resolve_many(
+            user_id, names, ids, SpotifyService.find_track_to_save, client.get_tracks, "tracks", SpotifyTrackDTO
+        )
+
+    @staticmethod
+    async def _resolve_many(user_id, names, ids, find_by_name, fetch_by_ids, key, dto_class):
+        # Devuelve (entrada, resultado) en el orden recibido; resultado es el DTO,
+        # None si Spotify no lo encuentra o la excepción de ese elemento.
+        semaphore = asyncio.Semaphore(settings.SPOTIFY_FANOUT_CONCURRENCY)
+
+        async def _by_name(name: str):
+            async with semaphore:
+                try:
+                    return name, await find_by_name(user_id, name)
+                except ValueError as e:
+                    if str(e) == "no_valid_token":
+                        raise
+                    return name, e
+                except Exception as e:
+                    return name, e
+
+        async def _by_ids(chunk: List[str]):
+            # Un error de Spotify (p. ej. 400 por un ID mal formado) solo afecta a su bloque.
+            async with semaphore:
+                try:
+                    data = await fetch_by_ids(user_id, chunk)
+                except Exception as e:
+                    return [(spotify_id, e) for spotify_id in chunk]
+            if "error" in data:
+                raise ValueError(data["error"])
+            return [(spotify_id, _to_dto(item)) for spotify_id, item in zip(chunk, data[key])]
+
+        def _to_dto(item):
+            if not item:
+                return None
+            try:
+                return dto_class(**item)
+            except ValidationError as e:
+                return e
+
+        results = list(await asyncio.gather(*[_by_name(name) for name in names]))
+        chunks = [ids[i:i + client.MAX_IDS_PER_REQUEST] for i in range(0, len(ids), client.MAX_IDS_PER_REQUEST)]
+        for chunk_results in await asyncio.gather(*[_by_ids(chunk) for chunk in chunks]):
+            results.extend(chunk_results)
+        return results
@@ -0,0 +1,58 @@
+import time
+from typing import Optional, Dict, Any
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class UserDetailCache:
+    # Payload serializado de GET /users/{id}/ en la caché de Django, con una clave de versión
+    # por usuario: invalidar es incrementar la versión, las entradas viejas caducan solas.
+    key_prefix = "users:detail:"
+
+    def _cache(self):
+        return caches[settings.USER_DETAIL_CACHE_ALIAS]
+
+    @property
+    def enabled(self) -> bool:
+        return settings.USER_DETAIL_CACHE_TTL > 0
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}:version"
+
+    def version(self, user_id: int) -> int:
+        # Versión inicial basada en el reloj: si la clave se expulsa, la nueva versión no
+        # coincide con la de ninguna entrada antigua que siga en caché.
+        cache = self._cache()
+        key = self._version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    def get(self, user_id: int, version: int) -> Optional[Dict[str, Any]]:
+        return self._cache().get(f"{self.key_prefix}{user_id}:{version}")
+
+    def set(self, user_id: int, version: int, entry: Dict[str, Any]) -> None:
+        self._cache().set(f"{self.key_prefix}{user_id}:{version}", entry, timeout=settings.USER_DETAIL_CACHE_TTL)
+
+    def _bump(self, user_id: int) -> None:
+        cache = self._cache()
+        try:
+            cache.incr(self._version_key(user_id))
+        except ValueError:
+            cache.set(self._version_key(user_id), time.time_ns(), timeout=None)
+
+    def invalidate(self, user_id: int) -> None:
+        if not self.enabled:
+            return
+        self._bump(user_id)
+        # Dentro de una transacción volvemos a invalidar tras el commit: una lectura entre
+        # ambos momentos habría cacheado datos sin confirmar bajo la versión nueva.
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._bump(user_id))
+
+
+user_detail_cache = UserDetailCache()
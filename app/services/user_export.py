@@ -0,0 +1,87 @@
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+
+from app.models import User, SavedArtist, SavedTrack
+
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+CSV_COLUMNS = ("id", "name", "age", "music_preferences", "favorite_artists", "favorite_tracks")
+
+
+class _Echo:
+    # csv.writer necesita un fichero; devolviendo la línea la podemos emitir en streaming.
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class UserExportService:
+    # Exportación de usuarios con sus favoritos en streaming: iterator(chunk_size) con
+    # prefetch por bloque, memoria constante sea cual sea el número de usuarios.
+
+    @staticmethod
+    def queryset(min_id: Optional[int] = None, max_id: Optional[int] = None,
+                 genre: Optional[str] = None) -> QuerySet:
+        queryset = User.objects.order_by('pk').prefetch_related(
+            Prefetch('favorite_artists', queryset=SavedArtist.objects.only('user_id', 'spotify_id', 'name')),
+            Prefetch('favorite_tracks', queryset=SavedTrack.objects.only('user_id', 'spotify_id', 'name')),
+        )
+        if min_id is not None:
+            queryset = queryset.filter(pk__gte=min_id)
+        if max_id is not None:
+            queryset = queryset.filter(pk__lte=max_id)
+        # icontains sobre el JSON solo descarta filas; la comparación exacta se hace en Python.
+        # Con géneros no ASCII no se prefiltra: según el backend el JSON se guarda escapado.
+        if genre and genre.isascii():
+            queryset = queryset.filter(music_preferences__icontains=genre)
+        return queryset
+
+    @staticmethod
+    def has_genre(user: User, genre: str) -> bool:
+        wanted = genre.strip().casefold()
+        return any(isinstance(g, str) and g.strip().casefold() == wanted for g in user.music_preferences or [])
+
+    @staticmethod
+    def rows(min_id: Optional[int] = None, max_id: Optional[int] = None, genre: Optional[str] = None,
+             chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        queryset = UserExportService.queryset(min_id, max_id, genre)
+        for user in queryset.iterator(chunk_size=chunk_size or settings.USER_EXPORT_CHUNK_SIZE):
+            if genre and not UserExportService.has_genre(user, genre):
+                continue
+            yield {
+                "id": user.pk,
+                "name": user.name,
+                "age": user.age,
+                "music_preferences": user.music_preferences,
+                "favorite_artists": [{"spotify_id": a.spotify_id, "name": a.name} for a in user.favorite_artists.all()],
+                "favorite_tracks": [{"spotify_id": t.spotify_id, "name": t.name} for t in user.favorite_tracks.all()],
+            }
+
+    @staticmethod
+    def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def csv_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        # Las listas van como JSON, el mismo formato que acepta import_users.
+        writer = csv.writer(_Echo())
+        yield writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            yield writer.writerow([
+                row[column] if not isinstance(row[column], list) else json.dumps(row[column], ensure_ascii=False)
+                for column in CSV_COLUMNS
+            ])
+
+    @staticmethod
+    def lines(fmt: str, **filters) -> Iterator[str]:
+        rows = UserExportService.rows(**filters)
+        if fmt == "csv":
+            return UserExportService.csv_lines(rows)
+        if fmt == "ndjson":
+            return UserExportService.ndjson_lines(rows)
+        raise ValueError(f"Unsupported export format: {fmt}")
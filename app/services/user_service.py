@@ -1,6 +1,9 @@
-from asgiref.sync import sync_to_async
+from typing import List, Set
+
 from django.shortcuts import get_object_or_404
+from app.db import database_sync_to_async
 from app.models import User, SavedArtist, SavedTrack
+from app.services.user_cache import user_detail_cache
 
 
 class UserService:
@@ -10,7 +13,7 @@ class UserService:
         return get_object_or_404(User, pk=user_id)
 
     @staticmethod
-    @sync_to_async
+    @database_sync_to_async
     def get_user_async(user_id: int):
         try:
             return User.objects.get(pk=user_id)
@@ -18,7 +21,7 @@ class UserService:
             return None
 
     @staticmethod
-    @sync_to_async
+    @database_sync_to_async
     def add_favorite_artist(user: User, artist_dto) -> SavedArtist:
         obj, created = SavedArtist.objects.get_or_create(
             user=user,
@@ -28,11 +31,36 @@ class UserService:
         return obj
 
     @staticmethod
-    @sync_to_async
+    @database_sync_to_async
     def add_favorite_track(user: User, track_dto) -> SavedTrack:
         obj, created = SavedTrack.objects.get_or_create(
             user=user,
             spotify_id=track_dto.id,
             defaults={'name': track_dto.name}
         )
-        return obj
\ No newline at end of file
+        return obj
+
+    @staticmethod
+    def _add_favorites_bulk(model, user: User, dtos: List) -> Set[str]:
+        # Devuelve los spotify_id que el usuario ya tenía guardados (no se insertan de nuevo).
+        # bulk_create no emite post_save: revisión y caché se actualizan aquí si algo cambia.
+        wanted = {dto.id: dto for dto in dtos}
+        existing = set(model.objects.filter(user=user, spotify_id__in=wanted).values_list('spotify_id', flat=True))
+        new = [model(user=user, spotify_id=dto.id, name=dto.name) for spotify_id, dto in wanted.items()
+               if spotify_id not in existing]
+        if new:
+            # ignore_conflicts cubre una inserción concurrente entre la consulta y el insert.
+            model.objects.bulk_create(new, ignore_conflicts=True)
+            User.bump_revision(user.pk)
+            user_detail_cache.invalidate(user.pk)
+        return existing
+
+    @staticmethod
+    @database_sync_to_async
+    def add_favorite_artists_bulk(user: User, artist_dtos: List) -> Set[str]:
+        return UserService._add_favorites_bulk(SavedArtist, user, artist_dtos)
+
+    @staticmethod
+    @database_sync_to_async
+    def add_favorite_tracks_bulk(user: User, track_dtos: List) -> Set[str]:
+        return UserService._add_favorites_bulk(SavedTrack, user, track_dtos)
@@ -0,0 +1,38 @@
+import weakref
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from app.models import User, SavedArtist, SavedTrack
+from app.services.user_cache import user_detail_cache
+
+# Usuarios ya marcados como cambiados por cada QuerySet.delete() en curso: todas las señales de
+# un mismo borrado comparten origin, así que basta una revisión nueva por usuario.
+_bumped_by_origin: "weakref.WeakKeyDictionary[QuerySet, set]" = weakref.WeakKeyDictionary()
+
+
+def _owner_is_being_deleted(origin) -> bool:
+    return isinstance(origin, User) or (isinstance(origin, QuerySet) and origin.model is User)
+
+
+@receiver([post_save, post_delete], sender=User, dispatch_uid="users.detail_cache.user")
+def invalidate_user_detail(sender, instance, **kwargs):
+    user_detail_cache.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=SavedArtist, dispatch_uid="users.detail_cache.artist")
+@receiver([post_save, post_delete], sender=SavedTrack, dispatch_uid="users.detail_cache.track")
+def favorites_changed(sender, instance, origin=None, **kwargs):
+    # Cualquier escritura de favoritos (servicio, admin, borrados masivos...) cambia el
+    # contenido del usuario: nueva revisión (ETag) y entrada de caché invalidada.
+    # En el borrado en cascada del propio usuario no hay nada que actualizar.
+    if _owner_is_being_deleted(origin):
+        return
+    if isinstance(origin, QuerySet):
+        bumped = _bumped_by_origin.setdefault(origin, set())
+        if instance.user_id in bumped:
+            return
+        bumped.add(instance.user_id)
+    User.bump_revision(instance.user_id)
+    user_detail_cache.invalidate(instance.user_id)
@@ -4,5 +4,7 @@ from .dtos import (
     SpotifyTokenDTO,
     SpotifyArtistDTO,
     SpotifyTrackDTO,
-    SpotifyImageDTO
+    SpotifyImageDTO,
+    ArtistListAdapter,
+    TrackListAdapter
 )
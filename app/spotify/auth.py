@@ -1,14 +1,18 @@
 import base64
+import logging
+import time
 import urllib.parse
 from typing import Optional
 
 import httpx
 from django.conf import settings
 
+from app import metrics
+from . import http
 from .dtos import SpotifyTokenDTO
+from .telemetry import PoolWaitTrace, record_response, telemetry
 
-AUTH_URL = "https://accounts.spotify.com/authorize"
-TOKEN_URL = "https://accounts.spotify.com/api/token"
+logger = logging.getLogger(__name__)
 
 
 def build_authorize_url(user_id: int) -> str:
@@ -19,7 +23,7 @@ def build_authorize_url(user_id: int) -> str:
         "state": str(user_id),
         "scope": "user-read-private user-read-email user-follow-read user-follow-modify"
     }
-    return f"{AUTH_URL}?{urllib.parse.urlencode(params)}"
+    return f"{settings.SPOTIFY_AUTH_URL}?{urllib.parse.urlencode(params)}"
 
 
 def _get_auth_header():
@@ -31,37 +35,58 @@ def _get_auth_header():
     }
 
 
+async def _post_token(data: dict) -> httpx.Response:
+    key = "POST /api/token"
+    trace = PoolWaitTrace()
+    started = time.monotonic()
+    try:
+        resp = await http.get_client().post(settings.SPOTIFY_TOKEN_URL, data=data, headers=_get_auth_header(),
+                                            extensions={"trace": trace})
+    except httpx.TransportError:
+        telemetry.record_call(key, "transport_error", time.monotonic() - started, pool_wait=trace.wait)
+        raise
+    finally:
+        metrics.record("spotify", time.monotonic() - started)
+    record_response(key, resp, time.monotonic() - started, trace)
+    return resp
+
+
 async def exchange_code_for_token(code: str) -> Optional[SpotifyTokenDTO]:
-    async with httpx.AsyncClient() as client:
-        data = {
-            "grant_type": "authorization_code",
-            "code": code,
-            "redirect_uri": settings.SPOTIFY_REDIRECT_URI
-        }
-        try:
-            resp = await client.post(TOKEN_URL, data=data, headers=_get_auth_header())
-            if resp.status_code != 200:
-                print(f"Auth Error: {resp.text}")
-                return None
-            return SpotifyTokenDTO(**resp.json())
-        except Exception as e:
-            print(f"Exception during token exchange: {e}")
+    data = {
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": settings.SPOTIFY_REDIRECT_URI
+    }
+    try:
+        resp = await _post_token(data)
+        if resp.status_code != 200:
+            logger.warning("Spotify code exchange rejected", extra={"status": resp.status_code, "body": resp.text[:500]})
             return None
+        return SpotifyTokenDTO(**resp.json())
+    except Exception:
+        logger.exception("Exception during Spotify code exchange")
+        return None
 
 
 async def refresh_token_with_refresh_token(refresh_token: str) -> Optional[SpotifyTokenDTO]:
-    async with httpx.AsyncClient() as client:
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": refresh_token
-        }
-        resp = await client.post(TOKEN_URL, data=data, headers=_get_auth_header())
-        if resp.status_code != 200:
-            return None
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token
+    }
+    try:
+        resp = await _post_token(data)
+    except Exception:
+        telemetry.record_refresh("error")
+        raise
+    if resp.status_code != 200:
+        telemetry.record_refresh("rejected")
+        logger.warning("Spotify token refresh rejected", extra={"status": resp.status_code})
+        return None
 
-        token_data = resp.json()
-        # La API a veces no devuelve refresh token nuevo, reusamos el viejo
-        if "refresh_token" not in token_data:
-            token_data["refresh_token"] = refresh_token
+    token_data = resp.json()
+    # La API a veces no devuelve refresh token nuevo, reusamos el viejo
+    if "refresh_token" not in token_data:
+        token_data["refresh_token"] = refresh_token
 
-        return SpotifyTokenDTO(**token_data)
+    telemetry.record_refresh("refreshed")
+    return SpotifyTokenDTO(**token_data)
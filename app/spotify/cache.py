@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+class LRUTTLCache:
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class TokenCache:
+    # Guarda (access_token, expires_at) por usuario. Con SPOTIFY_TOKEN_CACHE_ALIAS se usa
+    # una caché de Django compartida entre workers; si no, un LRU local al proceso.
+    key_prefix = "spotify:token:"
+
+    def __init__(self, margin_seconds: int = 60):
+        self.margin_seconds = margin_seconds
+        self._local: Optional[LRUTTLCache] = None
+
+    def _backend(self):
+        alias = settings.SPOTIFY_TOKEN_CACHE_ALIAS
+        if alias:
+            return caches[alias]
+        if self._local is None:
+            self._local = LRUTTLCache(settings.SPOTIFY_TOKEN_CACHE_SIZE, settings.SPOTIFY_TOKEN_CACHE_TTL)
+        return None
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    def _token_from(self, entry) -> Optional[str]:
+        if entry is None:
+            return None
+        access_token, expires_at = entry
+        if timezone.now().timestamp() > expires_at - self.margin_seconds:
+            return None
+        return access_token
+
+    def _entry_for(self, access_token: str, expires_at) -> Optional[Tuple[Tuple[str, float], float]]:
+        ttl = min(settings.SPOTIFY_TOKEN_CACHE_TTL,
+                  expires_at.timestamp() - self.margin_seconds - timezone.now().timestamp())
+        if ttl <= 0:
+            return None
+        return (access_token, expires_at.timestamp()), ttl
+
+    def get(self, user_id: int) -> Optional[str]:
+        shared = self._backend()
+        key = self._key(user_id)
+        return self._token_from(shared.get(key) if shared is not None else self._local.get(key))
+
+    def set(self, user_id: int, access_token: str, expires_at):
+        prepared = self._entry_for(access_token, expires_at)
+        if prepared is None:
+            return
+        entry, ttl = prepared
+        shared = self._backend()
+        if shared is not None:
+            shared.set(self._key(user_id), entry, timeout=int(ttl))
+        else:
+            self._local.set(self._key(user_id), entry, ttl=ttl)
+
+    def invalidate(self, user_id: int):
+        shared = self._backend()
+        if shared is not None:
+            shared.delete(self._key(user_id))
+        else:
+            self._local.delete(self._key(user_id))
+
+    # Variantes para código async: la caché compartida (Redis, memcached, DatabaseCache...) se
+    # consulta con aget/aset/adelete para no bloquear el event loop. El LRU local es memoria.
+
+    async def aget(self, user_id: int) -> Optional[str]:
+        shared = self._backend()
+        if shared is None:
+            return self.get(user_id)
+        return self._token_from(await shared.aget(self._key(user_id)))
+
+    async def aset(self, user_id: int, access_token: str, expires_at):
+        shared = self._backend()
+        if shared is None:
+            return self.set(user_id, access_token, expires_at)
+        prepared = self._entry_for(access_token, expires_at)
+        if prepared is not None:
+            entry, ttl = prepared
+            await shared.aset(self._key(user_id), entry, timeout=int(ttl))
+
+    async def ainvalidate(self, user_id: int):
+        shared = self._backend()
+        if shared is None:
+            return self.invalidate(user_id)
+        await shared.adelete(self._key(user_id))
+
+    def clear(self):
+        if self._local is not None:
+            self._local.clear()
+
+
+token_cache = TokenCache()
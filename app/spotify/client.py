@@ -1,16 +1,42 @@
+import asyncio
+import logging
+import time
+import weakref
 from typing import Optional, Dict, Any, List
 
 import httpx
-from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 
+from app import metrics
+from app.db import database_sync_to_async
+from app.errors import ExternalAPIError
 from app.models import SpotifyCredentials
+from . import http
 from .auth import refresh_token_with_refresh_token
+from .cache import LRUTTLCache, token_cache
+from .hedging import hedge_budget, hedge_delay, latency_tracker
+from .ratelimit import parse_retry_after, rate_limiter
+from .resilience import IDEMPOTENT_METHODS, backoff_delay, get_breaker
+from .telemetry import PoolWaitTrace, record_response, telemetry
 
-API_BASE = "https://api.spotify.com/v1"
+logger = logging.getLogger(__name__)
 
+REFRESH_POLL_INTERVAL = 0.2
+MAX_IDS_PER_REQUEST = 50
 
-@sync_to_async
+# Resultados de búsqueda compartidos entre usuarios: el catálogo no depende de quién pregunta.
+# Los dicts cacheados se comparten, no deben mutarse.
+search_cache = LRUTTLCache(settings.SPOTIFY_SEARCH_CACHE_SIZE, settings.SPOTIFY_SEARCH_CACHE_TTL)
+
+# Refrescos en curso por usuario dentro de cada event loop (single-flight).
+_inflight_refreshes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@database_sync_to_async
 def get_credentials(user_id: int):
     try:
         return SpotifyCredentials.objects.get(user_id=user_id)
@@ -18,17 +44,86 @@ def get_credentials(user_id: int):
         return None
 
 
-@sync_to_async
+@database_sync_to_async
 def update_credentials(cred: SpotifyCredentials, new_token_dto):
     cred.access_token = new_token_dto.access_token
     cred.expires_in = new_token_dto.expires_in
     cred.expires_at = timezone.now() + timezone.timedelta(seconds=new_token_dto.expires_in)
     if new_token_dto.refresh_token:
         cred.refresh_token = new_token_dto.refresh_token
-    cred.save()
+    cred.refresh_lease_until = None
+    cred.save(update_fields=['access_token', 'expires_in', 'expires_at', 'refresh_token', 'refresh_lease_until'])
+    token_cache.invalidate(cred.user_id)
+    token_cache.set(cred.user_id, cred.access_token, cred.expires_at)
+
+
+@database_sync_to_async
+def acquire_refresh_lease(cred: SpotifyCredentials) -> bool:
+    # UPDATE condicional: solo un worker gana el lease, y solo si nadie ha
+    # refrescado ya el token (expires_at sigue siendo el que leímos).
+    now = timezone.now()
+    acquired = SpotifyCredentials.objects.filter(
+        Q(refresh_lease_until__isnull=True) | Q(refresh_lease_until__lt=now),
+        pk=cred.pk,
+        expires_at=cred.expires_at,
+    ).update(refresh_lease_until=now + timezone.timedelta(seconds=settings.SPOTIFY_REFRESH_LEASE_SECONDS))
+    return acquired == 1
+
+
+@database_sync_to_async
+def release_refresh_lease(cred: SpotifyCredentials):
+    SpotifyCredentials.objects.filter(pk=cred.pk).update(refresh_lease_until=None)
+
+
+async def _wait_for_foreign_refresh(user_id: int) -> Optional[str]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SPOTIFY_REFRESH_LEASE_SECONDS
+    while True:
+        creds = await get_credentials(user_id)
+        if not creds:
+            return None
+        if not creds.is_expired():
+            return creds.access_token
+        if creds.refresh_lease_until is None or loop.time() >= deadline:
+            return None
+        await asyncio.sleep(REFRESH_POLL_INTERVAL)
+
+
+async def _refresh_credentials(creds: SpotifyCredentials) -> Optional[str]:
+    if not await acquire_refresh_lease(creds):
+        return await _wait_for_foreign_refresh(creds.user_id)
+
+    logger.info("Refreshing Spotify token", extra={"user_id": creds.user_id})
+    try:
+        refreshed_dto = await refresh_token_with_refresh_token(creds.refresh_token)
+    except Exception:
+        await release_refresh_lease(creds)
+        raise
+
+    if refreshed_dto is None:
+        await release_refresh_lease(creds)
+        return None
+
+    await update_credentials(creds, refreshed_dto)
+    return refreshed_dto.access_token
+
+
+async def _refresh_single_flight(creds: SpotifyCredentials) -> Optional[str]:
+    loop = asyncio.get_running_loop()
+    inflight = _inflight_refreshes.setdefault(loop, {})
+    task = inflight.get(creds.user_id)
+    if task is None:
+        task = loop.create_task(_refresh_credentials(creds))
+        inflight[creds.user_id] = task
+        task.add_done_callback(lambda _: inflight.pop(creds.user_id, None))
+    return await asyncio.shield(task)
 
 
 async def _ensure_valid_token_for_user(user_id: int) -> Optional[str]:
+    cached_token = await token_cache.aget(user_id)
+    if cached_token:
+        return cached_token
+
     creds = await get_credentials(user_id)
     if not creds:
         return None
@@ -36,76 +131,233 @@ async def _ensure_valid_token_for_user(user_id: int) -> Optional[str]:
     if creds.is_expired():
         if not creds.refresh_token:
             return None
+        return await _refresh_single_flight(creds)
 
-        print(f"Refreshing token for user {user_id}")
-        refreshed_dto = await refresh_token_with_refresh_token(creds.refresh_token)
+    await token_cache.aset(user_id, creds.access_token, creds.expires_at)
+    return creds.access_token
 
-        if refreshed_dto is None:
-            return None
 
-        await update_credentials(creds, refreshed_dto)
-        return refreshed_dto.access_token
+async def _request_until_not_throttled(method: str, url: str, key: str, headers: Dict[str, str], **kwargs):
+    # Una petición a Spotify, repetida mientras responda 429 (hasta SPOTIFY_RATE_LIMIT_RETRIES veces).
+    # Devuelve (respuesta, fallo, duración); los errores de transporte se devuelven como fallo sin respuesta.
+    rate_limited = 0
+    while True:
+        await rate_limiter.acquire()
+        trace = PoolWaitTrace()
+        started = time.monotonic()
+        try:
+            resp = await http.get_client().request(method, url, headers=headers, extensions={"trace": trace}, **kwargs)
+        except httpx.TransportError as e:
+            elapsed = time.monotonic() - started
+            metrics.record("spotify", elapsed)
+            telemetry.record_call(key, "transport_error", elapsed, pool_wait=trace.wait)
+            return None, f"{type(e).__name__}: {e}", elapsed
+        elapsed = time.monotonic() - started
+        metrics.record("spotify", elapsed)
+        record_response(key, resp, elapsed, trace)
 
-    return creds.access_token
+        if resp.status_code != 429:
+            return resp, None, elapsed
+        # Spotify indica cuánto esperar; bloqueamos a todos los llamantes y reintentamos
+        # (acquire lanza ExternalAPIError si la espera supera SPOTIFY_RATE_LIMIT_MAX_WAIT).
+        await rate_limiter.penalize(parse_retry_after(resp.headers.get("Retry-After")))
+        if rate_limited >= settings.SPOTIFY_RATE_LIMIT_RETRIES:
+            logger.error("Spotify call rate limited", extra={"path": key, "retries": rate_limited})
+            raise ExternalAPIError("Spotify", f"{key} still rate limited after {rate_limited} retries")
+        rate_limited += 1
+        telemetry.record_retry(key, "rate_limited")
 
 
-async def _spotify_get(access_token: str, path: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
-    url = f"{API_BASE}{path}"
+async def _send(method: str, access_token: str, path: str, **kwargs) -> httpx.Response:
+    url = f"{settings.SPOTIFY_API_BASE}{path}"
     headers = {"Authorization": f"Bearer {access_token}"}
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url, headers=headers, params=params)
-        if resp.status_code == 401:
-            return {"error": "token_expired_or_invalid"}
-        resp.raise_for_status()
-        return resp.json()
+    if "json" in kwargs:
+        headers["Content-Type"] = "application/json"
+
+    key = f"{method} {path}"
+    breaker = get_breaker(key)
+    max_retries = settings.SPOTIFY_RETRY_ATTEMPTS if method in IDEMPOTENT_METHODS else 0
+    attempt = 0
+
+    while True:
+        probe = breaker.before_call()
+        try:
+            resp, failure, elapsed = await _request_until_not_throttled(method, url, key, headers, **kwargs)
+        except BaseException:
+            # Sin resultado (cancelada, p. ej. la perdedora de un hedge, o sin cupo de 429):
+            # si era la llamada de prueba la damos por fallida para reabrir el circuito.
+            if probe:
+                breaker.record_failure()
+            raise
+
+        if resp is not None:
+            if resp.status_code < 500:
+                breaker.record_success()
+                latency_tracker.record(key, elapsed)
+                return resp
+            failure = f"HTTP {resp.status_code}"
+
+        breaker.record_failure()
+        if attempt >= max_retries or breaker.is_open:
+            logger.error("Spotify call failed", extra={"path": key, "attempts": attempt + 1, "failure": failure})
+            raise ExternalAPIError("Spotify", f"{key} failed after {attempt + 1} attempt(s): {failure}")
+        telemetry.record_retry(key, "server_error" if resp is not None else "transport_error")
+        logger.warning("Retrying Spotify call", extra={"path": key, "attempt": attempt + 1, "failure": failure})
+        await asyncio.sleep(backoff_delay(attempt))
+        attempt += 1
+
+
+async def _hedged_send(method: str, access_token: str, path: str, **kwargs) -> httpx.Response:
+    # Si la primera petición tarda más que el percentil configurado lanzamos una segunda
+    # (si el presupuesto lo permite) y nos quedamos con la que responda antes.
+    hedge_budget.on_request()
+    primary = asyncio.ensure_future(_send(method, access_token, path, **kwargs))
+    done, _ = await asyncio.wait({primary}, timeout=hedge_delay(f"{method} {path}"))
+    if done or not hedge_budget.try_acquire():
+        return await primary
+
+    hedge = asyncio.ensure_future(_send(method, access_token, path, **kwargs))
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None or not pending:
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _spotify_get(access_token: str, path: str, params: Optional[Dict[str, str]] = None,
+                       hedge: bool = False) -> Dict[str, Any]:
+    if hedge and settings.SPOTIFY_HEDGE_ENABLED:
+        resp = await _hedged_send("GET", access_token, path, params=params)
+    else:
+        resp = await _send("GET", access_token, path, params=params)
+    if resp.status_code == 401:
+        return {"error": "token_expired_or_invalid"}
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def _spotify_put(access_token: str, path: str, params: Optional[Dict[str, str]] = None,
                        json_body: Any = None) -> bool:
-    url = f"{API_BASE}{path}"
-    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.put(url, headers=headers, params=params, json=json_body)
-        if resp.status_code == 401:
-            return False
-        if resp.status_code not in [200, 204]:
-            resp.raise_for_status()
-        return True
-
-
-async def search_artist(user_id: int, q: str, limit: int = 5) -> Any:
+    resp = await _send("PUT", access_token, path, params=params, json=json_body)
+    if resp.status_code == 401:
+        return False
+    if resp.status_code not in [200, 204]:
+        resp.raise_for_status()
+    return True
+
+
+def _normalize_query(q: str) -> str:
+    return " ".join(q.split()).casefold()
+
+
+async def _search(user_id: int, q: str, type_: str, limit: int, market: Optional[str]) -> Any:
     token = await _ensure_valid_token_for_user(user_id)
     if not token: return {"error": "no_valid_token"}
 
-    data = await _spotify_get(token, "/search", params={"q": q, "type": "artist", "limit": str(limit)})
+    cache_key = (type_, _normalize_query(q), limit, market or "")
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    params = {"q": q, "type": type_, "limit": str(limit)}
+    if market:
+        params["market"] = market
+    data = await _spotify_get(token, "/search", params=params, hedge=True)
+    if "error" not in data:
+        search_cache.set(cache_key, data)
     return data
 
 
-async def search_track(user_id: int, q: str, limit: int = 5) -> Any:
-    token = await _ensure_valid_token_for_user(user_id)
-    if not token: return {"error": "no_valid_token"}
-    return await _spotify_get(token, "/search", params={"q": q, "type": "track", "limit": str(limit)})
+async def search_artist(user_id: int, q: str, limit: int = 5, market: Optional[str] = None) -> Any:
+    return await _search(user_id, q, "artist", limit, market)
+
+
+async def search_track(user_id: int, q: str, limit: int = 5, market: Optional[str] = None) -> Any:
+    return await _search(user_id, q, "track", limit, market)
 
 
 async def follow_ids(user_id: int, ids: List[str], type_: str) -> Dict[str, Any]:
     token = await _ensure_valid_token_for_user(user_id)
     if not token: return {"error": "no_valid_token"}
 
+    async def _follow_chunk(chunk: List[str]) -> bool:
+        return await _spotify_put(token, "/me/following", params={"type": type_}, json_body={"ids": chunk})
+
     try:
-        await _spotify_put(token, "/me/following", params={"type": type_}, json_body={"ids": ids})
-        return {"success": True}
+        results = await _fan_out(_chunks(ids), _follow_chunk)
+    except ExternalAPIError:
+        # Circuito abierto, reintentos agotados...: custom_exception_handler responde 502.
+        raise
     except Exception as e:
         return {"error": str(e)}
+    if not all(results):
+        return {"error": "token_expired_or_invalid"}
+    return {"success": True}
 
 
-async def get_followed_artists(user_id: int, limit: int = 20) -> Dict[str, Any]:
+async def get_followed_artists(user_id: int, limit: int = 20, after: Optional[str] = None) -> Dict[str, Any]:
     token = await _ensure_valid_token_for_user(user_id)
     if not token: return {"error": "no_valid_token"}
-    return await _spotify_get(token, "/me/following", params={"type": "artist", "limit": str(limit)})
+    params = {"type": "artist", "limit": str(limit)}
+    if after:
+        params["after"] = after
+    return await _spotify_get(token, "/me/following", params=params)
 
 
-async def check_following_status(user_id: int, ids: List[str], type_: str) -> Dict[str, Any]:
+async def check_following_status(user_id: int, ids: List[str], type_: str) -> Any:
     token = await _ensure_valid_token_for_user(user_id)
     if not token: return {"error": "no_valid_token"}
-    ids_str = ",".join(ids)
-    return await _spotify_get(token, "/me/following/contains", params={"type": type_, "ids": ids_str})
+
+    async def _check_chunk(chunk: List[str]) -> Any:
+        return await _spotify_get(token, "/me/following/contains", params={"type": type_, "ids": ",".join(chunk)},
+                                  hedge=True)
+
+    merged = []
+    for result in await _fan_out(_chunks(ids), _check_chunk):
+        if isinstance(result, dict) and "error" in result:
+            return result
+        merged.extend(result)
+    return merged
+
+
+def _chunks(items: List[str], size: int = MAX_IDS_PER_REQUEST) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def _fan_out(chunks: List[List[str]], call) -> List[Any]:
+    # Lanza una llamada por chunk con paralelismo acotado; gather mantiene el orden.
+    semaphore = asyncio.Semaphore(settings.SPOTIFY_FANOUT_CONCURRENCY)
+
+    async def _bounded(chunk: List[str]):
+        async with semaphore:
+            return await call(chunk)
+
+    return await asyncio.gather(*[_bounded(chunk) for chunk in chunks])
+
+
+async def _get_several(user_id: int, path: str, key: str, ids: List[str]) -> Dict[str, Any]:
+    token = await _ensure_valid_token_for_user(user_id)
+    if not token: return {"error": "no_valid_token"}
+
+    async def _get_chunk(chunk: List[str]) -> Dict[str, Any]:
+        return await _spotify_get(token, path, params={"ids": ",".join(chunk)})
+
+    items = []
+    for data in await _fan_out(_chunks(ids), _get_chunk):
+        if "error" in data:
+            return data
+        items.extend(data.get(key, []))
+    return {key: items}
+
+
+async def get_artists(user_id: int, ids: List[str]) -> Dict[str, Any]:
+    return await _get_several(user_id, "/artists", "artists", ids)
+
+
+async def get_tracks(user_id: int, ids: List[str]) -> Dict[str, Any]:
+    return await _get_several(user_id, "/tracks", "tracks", ids)
@@ -1,7 +1,7 @@
 import time
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
 
 
 class SpotifyImageDTO(BaseModel):
@@ -15,6 +15,7 @@ class SpotifyArtistDTO(BaseModel):
     name: str
     popularity: Optional[int] = None
     genres: List[str] = Field(default_factory=list)
+    images: Optional[List[SpotifyImageDTO]] = None
     href: str
     uri: str
 
@@ -30,6 +31,14 @@ class SpotifyTrackDTO(BaseModel):
     href: str
     uri: str
 
+    @model_validator(mode="before")
+    @classmethod
+    def _album_name_from_album(cls, data: Any) -> Any:
+        # Spotify devuelve el álbum anidado ({"album": {"name": ...}})
+        if isinstance(data, dict) and not data.get("album_name") and isinstance(data.get("album"), dict):
+            data = {**data, "album_name": data["album"].get("name") or ""}
+        return data
+
 
 class SpotifyTokenDTO(BaseModel):
     access_token: str
@@ -38,3 +47,7 @@ class SpotifyTokenDTO(BaseModel):
     refresh_token: Optional[str] = None
     scope: str
     created_at: float = Field(default_factory=time.time)
+
+
+ArtistListAdapter = TypeAdapter(List[SpotifyArtistDTO])
+TrackListAdapter = TypeAdapter(List[SpotifyTrackDTO])
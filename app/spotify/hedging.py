@@ -0,0 +1,70 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from django.conf import settings
+
+MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class HedgeBudget:
+    # Cada petición cubrible gana `ratio` fichas (hasta `burst`) y cada hedge gasta una:
+    # a largo plazo como mucho un `ratio` de peticiones se duplican.
+
+    def __init__(self):
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._tokens = min(settings.SPOTIFY_HEDGE_BUDGET_BURST,
+                               self._tokens + settings.SPOTIFY_HEDGE_BUDGET_RATIO)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._tokens = 0.0
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+
+
+def hedge_delay(key: str) -> float:
+    observed = latency_tracker.percentile(key, settings.SPOTIFY_HEDGE_PERCENTILE)
+    if observed is None:
+        return settings.SPOTIFY_HEDGE_DELAY
+    return max(settings.SPOTIFY_HEDGE_MIN_DELAY, observed)
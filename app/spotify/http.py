@@ -0,0 +1,107 @@
+import asyncio
+import atexit
+import logging
+import weakref
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Un AsyncClient solo es válido dentro del event loop que lo creó. Bajo ASGI hay un
+# único loop por worker; bajo WSGI async_to_sync crea un loop por llamada, así que
+# guardamos un cliente por loop y lo cerramos cuando ese loop termina.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+# Referencias fuertes a las tareas de cierre: el loop solo guarda referencias débiles.
+_closers: "set[asyncio.Task]" = set()
+
+
+def _http2_enabled() -> bool:
+    if not settings.SPOTIFY_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("SPOTIFY_HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.SPOTIFY_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SPOTIFY_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SPOTIFY_HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(settings.SPOTIFY_HTTP_TIMEOUT),
+        http2=_http2_enabled(),
+    )
+
+
+async def _close_when_loop_ends(client: httpx.AsyncClient) -> None:
+    # asyncio.run (y con él async_to_sync) cancela las tareas pendientes antes de cerrar
+    # el loop; la cancelación es la señal para cerrar el cliente y sus sockets.
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if not client.is_closed:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug("Could not close Spotify HTTP client cleanly", extra={"error": str(e)})
+
+
+def get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _clients[loop] = client
+        closer = loop.create_task(_close_when_loop_ends(client))
+        _closers.add(closer)
+        closer.add_done_callback(_closers.discard)
+    return client
+
+
+async def aclose_client() -> None:
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def close_clients() -> None:
+    for loop, client in list(_clients.items()):
+        _clients.pop(loop, None)
+        if client.is_closed or loop.is_closed() or loop.is_running():
+            continue
+        try:
+            loop.run_until_complete(client.aclose())
+        except Exception as e:
+            logger.debug("Could not close Spotify HTTP client cleanly", extra={"error": str(e)})
+
+
+atexit.register(close_clients)
+
+
+class LifespanMiddleware:
+    # Django no gestiona el protocolo lifespan; lo atendemos aquí para cerrar el pool al apagar.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await aclose_client()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
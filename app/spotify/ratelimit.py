@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from app.errors import ExternalAPIError
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return float(settings.SPOTIFY_RATE_LIMIT_DEFAULT_RETRY_AFTER)
+
+
+class SpotifyRateLimiter:
+    # Token bucket para toda la app + bloqueo global cuando Spotify responde 429.
+    # Con SPOTIFY_RATE_LIMIT_CACHE_ALIAS el bloqueo y el cupo por segundo se comparten
+    # entre workers a través de la caché de Django.
+    blocked_key = "spotify:ratelimit:blocked_until"
+    window_key_prefix = "spotify:ratelimit:window:"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Optional[float] = None
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _shared_cache(self):
+        alias = settings.SPOTIFY_RATE_LIMIT_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    async def acquire(self):
+        waited = 0.0
+        while True:
+            wait = await self._next_wait()
+            if wait <= 0:
+                return
+            if waited + wait > settings.SPOTIFY_RATE_LIMIT_MAX_WAIT:
+                raise ExternalAPIError("Spotify", f"rate limit exceeded, retry in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            waited += wait
+
+    async def penalize(self, retry_after: float):
+        until = time.time() + retry_after
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, until)
+        shared = self._shared_cache()
+        if shared is not None:
+            await shared.aset(self.blocked_key, until, timeout=int(retry_after) + 1)
+
+    def reset(self):
+        with self._lock:
+            self._tokens = None
+            self._updated = time.monotonic()
+            self._blocked_until = 0.0
+
+    async def _next_wait(self) -> float:
+        now = time.time()
+        shared = self._shared_cache()
+        blocked_until = self._blocked_until
+        if shared is not None:
+            blocked_until = max(blocked_until, await shared.aget(self.blocked_key, 0.0))
+        if now < blocked_until:
+            return blocked_until - now
+
+        if settings.SPOTIFY_RATE_LIMIT_PER_SECOND <= 0:
+            return 0.0
+        if shared is not None:
+            return await self._take_shared(shared, now)
+        return self._take_local()
+
+    def _take_local(self) -> float:
+        rate = settings.SPOTIFY_RATE_LIMIT_PER_SECOND
+        burst = max(1, settings.SPOTIFY_RATE_LIMIT_BURST)
+        with self._lock:
+            now = time.monotonic()
+            if self._tokens is None:
+                self._tokens = float(burst)
+            self._tokens = min(burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+    async def _take_shared(self, shared, now: float) -> float:
+        # Ventana fija de un segundo: todos los workers incrementan el mismo contador.
+        second = int(now)
+        key = f"{self.window_key_prefix}{second}"
+        await shared.aadd(key, 0, timeout=5)
+        try:
+            count = await shared.aincr(key)
+        except ValueError:
+            count = 1
+        if count <= settings.SPOTIFY_RATE_LIMIT_PER_SECOND:
+            return 0.0
+        return (second + 1) - now
+
+
+rate_limiter = SpotifyRateLimiter()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from app.db import database_sync_to_async
+from app.models import SpotifyCredentials
+from .auth import refresh_token_with_refresh_token
+from .cache import token_cache
+from .dtos import SpotifyTokenDTO
+
+logger = logging.getLogger(__name__)
+
+REFRESHED_FIELDS = ['access_token', 'expires_in', 'expires_at', 'refresh_token', 'refresh_lease_until']
+
+
+@database_sync_to_async
+def _find_expiring_ids(cutoff) -> List[int]:
+    return list(
+        SpotifyCredentials.objects
+        .filter(expires_at__lte=cutoff, refresh_token__isnull=False)
+        .order_by('expires_at')
+        .values_list('pk', flat=True)
+    )
+
+
+@database_sync_to_async
+def _lease_batch(ids: List[int]) -> List[SpotifyCredentials]:
+    # Todas las filas del lote reciben el mismo instante de lease; releyendo por ese
+    # valor sabemos cuáles ha ganado este proceso y cuáles tiene ya otro worker.
+    now = timezone.now()
+    lease_until = now + timezone.timedelta(seconds=settings.SPOTIFY_REFRESH_LEASE_SECONDS)
+    SpotifyCredentials.objects.filter(
+        Q(refresh_lease_until__isnull=True) | Q(refresh_lease_until__lt=now),
+        pk__in=ids,
+    ).update(refresh_lease_until=lease_until)
+    return list(SpotifyCredentials.objects.filter(pk__in=ids, refresh_lease_until=lease_until))
+
+
+@database_sync_to_async
+def _store_batch(refreshed: List[SpotifyCredentials], failed: List[SpotifyCredentials]):
+    if refreshed:
+        SpotifyCredentials.objects.bulk_update(refreshed, REFRESHED_FIELDS)
+        for cred in refreshed:
+            token_cache.set(cred.user_id, cred.access_token, cred.expires_at)
+    if failed:
+        SpotifyCredentials.objects.filter(pk__in=[c.pk for c in failed]).update(refresh_lease_until=None)
+
+
+def _apply_token(cred: SpotifyCredentials, token_dto: SpotifyTokenDTO):
+    cred.access_token = token_dto.access_token
+    cred.expires_in = token_dto.expires_in
+    cred.expires_at = timezone.now() + timezone.timedelta(seconds=token_dto.expires_in)
+    if token_dto.refresh_token:
+        cred.refresh_token = token_dto.refresh_token
+    cred.refresh_lease_until = None
+
+
+async def _refresh_one(cred: SpotifyCredentials, semaphore: asyncio.Semaphore) -> Tuple[SpotifyCredentials, bool]:
+    async with semaphore:
+        try:
+            token_dto: Optional[SpotifyTokenDTO] = await refresh_token_with_refresh_token(cred.refresh_token)
+        except Exception as e:
+            logger.warning("Proactive refresh failed", extra={"user_id": cred.user_id, "error": str(e)})
+            return cred, False
+
+    if token_dto is None:
+        return cred, False
+
+    _apply_token(cred, token_dto)
+    return cred, True
+
+
+async def refresh_expiring_credentials(lookahead_seconds: int, concurrency: int = 10,
+                                       batch_size: int = 100) -> Dict[str, int]:
+    cutoff = timezone.now() + timezone.timedelta(seconds=lookahead_seconds)
+    ids = await _find_expiring_ids(cutoff)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"candidates": len(ids), "refreshed": 0, "failed": 0, "skipped": 0}
+
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start:start + batch_size]
+        leased = await _lease_batch(batch_ids)
+        stats["skipped"] += len(batch_ids) - len(leased)
+
+        results = await asyncio.gather(*[_refresh_one(cred, semaphore) for cred in leased])
+        refreshed = [cred for cred, ok in results if ok]
+        failed = [cred for cred, ok in results if not ok]
+        await _store_batch(refreshed, failed)
+
+        stats["refreshed"] += len(refreshed)
+        stats["failed"] += len(failed)
+
+    return stats
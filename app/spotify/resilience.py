@@ -0,0 +1,81 @@
+import random
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+
+from app.errors import ExternalAPIError
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+
+def backoff_delay(attempt: int) -> float:
+    # "Full jitter": espera aleatoria entre 0 y el backoff exponencial acotado.
+    ceiling = min(settings.SPOTIFY_RETRY_BACKOFF_MAX, settings.SPOTIFY_RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        # Devuelve True si esta llamada es la de prueba: quien la hace debe registrar su
+        # resultado (éxito o fallo) o el circuito no sale de HALF_OPEN.
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and now - self.probe_started >= settings.SPOTIFY_BREAKER_PROBE_TIMEOUT:
+                # La prueba no ha informado a tiempo: cuenta como fallida.
+                self.state = self.OPEN
+                self.opened_at = self.probe_started + settings.SPOTIFY_BREAKER_PROBE_TIMEOUT
+            if self.state == self.OPEN and now - self.opened_at >= settings.SPOTIFY_BREAKER_RESET_TIMEOUT:
+                # Dejamos pasar una única llamada de prueba.
+                self.state = self.HALF_OPEN
+                self.probe_started = now
+                return True
+        raise ExternalAPIError("Spotify", f"circuit open for {self.name}, upstream considered unavailable")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
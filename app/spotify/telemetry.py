@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Union
+
+from app.metrics import DEFAULT_BUCKETS, Histogram, format_labels, histogram_lines
+
+# Eventos de httpcore que indican que la petición ya tiene conexión del pool
+# (nueva: connect_tcp; reutilizada: envío directo de cabeceras).
+_CONNECTION_READY_EVENTS = (".connect_tcp.started", ".send_request_headers.started")
+
+
+class PoolWaitTrace:
+    # Extensión "trace" de httpx: mide cuánto espera la petición hasta obtener conexión.
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.wait: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        if self.wait is None and event_name.endswith(_CONNECTION_READY_EVENTS):
+            self.wait = time.monotonic() - self.started
+
+
+class _PathStats:
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.pool_wait = Histogram(buckets)
+        self.statuses: Dict[Union[int, str], int] = defaultdict(int)
+        self.retries: Dict[str, int] = defaultdict(int)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class SpotifyTelemetry:
+    # Telemetría de las llamadas salientes a Spotify, agregada por "MÉTODO /ruta".
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._paths: Dict[str, _PathStats] = {}
+            self._refreshes: Dict[str, int] = defaultdict(int)
+
+    def _path(self, key: str) -> _PathStats:
+        stats = self._paths.get(key)
+        if stats is None:
+            stats = self._paths[key] = _PathStats(self.buckets)
+        return stats
+
+    def record_call(self, key: str, status: Union[int, str], elapsed: float, bytes_sent: int = 0,
+                    bytes_received: int = 0, pool_wait: Optional[float] = None) -> None:
+        with self._lock:
+            stats = self._path(key)
+            stats.latency.observe(elapsed)
+            stats.statuses[status] += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if pool_wait is not None:
+                stats.pool_wait.observe(pool_wait)
+
+    def record_retry(self, key: str, reason: str) -> None:
+        with self._lock:
+            self._path(key).retries[reason] += 1
+
+    def record_refresh(self, outcome: str) -> None:
+        with self._lock:
+            self._refreshes[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            paths = {}
+            for key, stats in self._paths.items():
+                paths[key] = {
+                    "calls": stats.latency.count,
+                    "latency_seconds_sum": stats.latency.sum,
+                    "latency_buckets": dict(stats.latency.cumulative()),
+                    "statuses": dict(stats.statuses),
+                    "retries": dict(stats.retries),
+                    "pool_wait_seconds_sum": stats.pool_wait.sum,
+                    "pool_wait_buckets": dict(stats.pool_wait.cumulative()),
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                }
+            return {"paths": paths, "refreshes": dict(self._refreshes)}
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            items = sorted(self._paths.items())
+            lines: List[str] = ["# HELP spotify_request_duration_seconds Latency of calls to Spotify.",
+                                "# TYPE spotify_request_duration_seconds histogram"]
+            for key, stats in items:
+                lines += histogram_lines("spotify_request_duration_seconds", stats.latency, path=key)
+
+            lines += ["# HELP spotify_pool_wait_seconds Time waiting for a pooled connection.",
+                      "# TYPE spotify_pool_wait_seconds histogram"]
+            for key, stats in items:
+                if stats.pool_wait.count:
+                    lines += histogram_lines("spotify_pool_wait_seconds", stats.pool_wait, path=key)
+
+            lines += ["# HELP spotify_responses_total Responses from Spotify by status.",
+                      "# TYPE spotify_responses_total counter"]
+            for key, stats in items:
+                for status, count in sorted(stats.statuses.items(), key=lambda kv: str(kv[0])):
+                    lines.append(f"spotify_responses_total{{{format_labels(path=key, status=status)}}} {count}")
+
+            lines += ["# HELP spotify_retries_total Retried calls by reason.", "# TYPE spotify_retries_total counter"]
+            for key, stats in items:
+                for reason, count in sorted(stats.retries.items()):
+                    lines.append(f"spotify_retries_total{{{format_labels(path=key, reason=reason)}}} {count}")
+
+            lines += ["# HELP spotify_bytes_total Bytes transferred with Spotify.", "# TYPE spotify_bytes_total counter"]
+            for key, stats in items:
+                lines.append(f"spotify_bytes_total{{{format_labels(path=key, direction='sent')}}} {stats.bytes_sent}")
+                lines.append(f"spotify_bytes_total{{{format_labels(path=key, direction='received')}}} {stats.bytes_received}")
+
+            lines += ["# HELP spotify_token_refreshes_total Token refreshes by outcome.",
+                      "# TYPE spotify_token_refreshes_total counter"]
+            for outcome, count in sorted(self._refreshes.items()):
+                lines.append(f"spotify_token_refreshes_total{{{format_labels(outcome=outcome)}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def record_response(key: str, resp, elapsed: float, trace: Optional[PoolWaitTrace] = None) -> None:
+    telemetry.record_call(
+        key,
+        resp.status_code,
+        elapsed,
+        bytes_sent=len(resp.request.content),
+        bytes_received=resp.num_bytes_downloaded,
+        pool_wait=trace.wait if trace is not None else None,
+    )
+
+
+telemetry = SpotifyTelemetry()
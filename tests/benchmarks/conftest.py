@@ -0,0 +1,112 @@
+import json
+import os
+import timeit
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).parent
+BASELINES_FILE = BENCHMARKS_DIR / "baselines.json"
+PAYLOADS_DIR = BENCHMARKS_DIR / "payloads"
+
+# Las baselines no son segundos sino múltiplos de un bucle de calibración medido justo antes de
+# cada benchmark: así la comparación no depende de la velocidad de la máquina ni de su carga
+# en ese momento. Margen sobre la baseline antes de dar la medición por regresión (ajustable
+# por entorno); las operaciones de menos de 1 ms son más ruidosas y reciben más holgura.
+DEFAULT_TOLERANCE = 1.5
+SUB_MS_TOLERANCE = 2.0
+REPEAT = 7
+CALIBRATION_NUMBER = 200
+
+
+def _calibration_work():
+    # Mezcla parecida a las rutas medidas: dicts, atributos, formateo y JSON.
+    rows = [{"id": i, "name": f"item {i}", "tags": ["a", "b"]} for i in range(20)]
+    return json.dumps([{key: row[key] for key in ("id", "name")} for row in rows])
+
+
+def _measure(fn, number: int):
+    # Rondas alternas de calibración y medición: el ruido de la máquina afecta a ambas por igual.
+    # Nos quedamos con el mínimo de cada una (la ejecución menos perturbada).
+    calibration, seconds = [], []
+    for _ in range(REPEAT):
+        calibration.append(timeit.timeit(_calibration_work, number=CALIBRATION_NUMBER) / CALIBRATION_NUMBER)
+        seconds.append(timeit.timeit(fn, number=number) / number)
+    return min(seconds), min(seconds) / min(calibration)
+
+
+_results = {}
+
+
+def _enabled(config) -> bool:
+    return (
+        config.getoption("--benchmark")
+        or config.getoption("--benchmark-update")
+        or os.environ.get("RUN_BENCHMARKS") == "1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if _enabled(config):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark or RUN_BENCHMARKS=1")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results or not session.config.getoption("--benchmark-update"):
+        return
+    baselines = _load_baselines()
+    baselines.update({name: float(f"{relative:.3g}") for name, (_, relative) in _results.items()})
+    BASELINES_FILE.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("benchmarks")
+    baselines = _load_baselines()
+    for name, (seconds, relative) in sorted(_results.items()):
+        baseline = baselines.get(name)
+        ratio = f"{relative / baseline:.2f}x baseline" if baseline else "no baseline"
+        terminalreporter.write_line(f"{name:<45} {seconds * 1e6:>10.1f} us/op {relative:>9.2f} units  ({ratio})")
+
+
+def _load_baselines() -> dict:
+    if not BASELINES_FILE.exists():
+        return {}
+    return json.loads(BASELINES_FILE.read_text())
+
+
+@pytest.fixture(scope="session")
+def load_payload():
+    def _load(name: str):
+        return json.loads((PAYLOADS_DIR / name).read_text())
+    return _load
+
+
+@pytest.fixture
+def bench(request):
+    update = request.config.getoption("--benchmark-update")
+    tolerance = float(os.environ.get("BENCHMARK_TOLERANCE", DEFAULT_TOLERANCE))
+
+    def _run(name: str, fn, number: int = 1000) -> float:
+        # Calentamiento: imports perezosos, cachés de pydantic/DRF, frecuencia de la CPU...
+        timeit.timeit(fn, number=max(1, number // 5))
+        seconds, relative = _measure(fn, number)
+        _results[name] = (seconds, relative)
+        if update:
+            return seconds
+
+        baseline = _load_baselines().get(name)
+        assert baseline is not None, f"No pinned baseline for '{name}'; run pytest --benchmark-update"
+        limit = baseline * (max(tolerance, SUB_MS_TOLERANCE) if seconds < 1e-3 else tolerance)
+        assert relative <= limit, (
+            f"Benchmark regression in '{name}': {relative:.2f} calibration units/op "
+            f"({seconds * 1e6:.1f}us) exceeds {limit:.2f} (baseline {baseline:.2f})"
+        )
+        return seconds
+
+    return _run
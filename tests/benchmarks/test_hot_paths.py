@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.test import APIRequestFactory
+
+from app.api.permissions import HasAPIKey
+from app.api.serializers import UserSerializer
+from app.api.views import SearchArtistView
+from app.errors import EntityNotFoundError, ExternalAPIError
+from app.models import User, SavedArtist, SavedTrack, SpotifyCredentials
+from app.spotify.dtos import ArtistListAdapter, TrackListAdapter
+from app.utils import custom_exception_handler
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture
+def factory():
+    return APIRequestFactory()
+
+
+def _user_with_favorites(n: int) -> User:
+    user = User.objects.create(name="Bench User", age=30, music_preferences=["Rock", "Jazz"])
+    SavedArtist.objects.bulk_create(
+        SavedArtist(user=user, spotify_id=f"artist{i:016d}", name=f"Artist {i}") for i in range(n)
+    )
+    SavedTrack.objects.bulk_create(
+        SavedTrack(user=user, spotify_id=f"track{i:017d}", name=f"Track {i}") for i in range(n)
+    )
+    return User.objects.prefetch_related("favorite_artists", "favorite_tracks").get(pk=user.pk)
+
+
+class TestSerializationBenchmarks:
+
+    @pytest.mark.parametrize("favorites", [0, 10, 100])
+    def test_user_serializer(self, bench, favorites):
+        user = _user_with_favorites(favorites)
+        bench(f"user_serializer_{favorites}_favorites", lambda: UserSerializer(user).data, number=200)
+
+    def test_artist_dto_parsing(self, bench, load_payload):
+        items = load_payload("search_artists.json")["artists"]["items"]
+        bench("artist_dto_parse_50", lambda: ArtistListAdapter.validate_python(items), number=200)
+
+    def test_track_dto_parsing(self, bench, load_payload):
+        items = load_payload("search_tracks.json")["tracks"]["items"]
+        bench("track_dto_parse_50", lambda: TrackListAdapter.validate_python(items), number=200)
+
+
+class TestRequestPipelineBenchmarks:
+
+    def test_exception_handler_domain_error(self, bench):
+        exc = EntityNotFoundError("User", "1")
+        bench("exception_handler_not_found", lambda: custom_exception_handler(exc, {}))
+
+    def test_exception_handler_validation_error(self, bench):
+        exc = DRFValidationError({"name": ["This field is required."]})
+        bench("exception_handler_validation", lambda: custom_exception_handler(exc, {}))
+
+    def test_exception_handler_external_error(self, bench):
+        exc = ExternalAPIError("Spotify", "Service Unavailable")
+        with patch("app.utils.logger"):
+            bench("exception_handler_external", lambda: custom_exception_handler(exc, {}))
+
+    def test_has_api_key(self, bench, factory):
+        request = factory.get("/users/", HTTP_X_API_KEY=settings.SECRET_KEY)
+        permission = HasAPIKey()
+        bench("has_api_key", lambda: permission.has_permission(request, None), number=5000)
+
+    def test_credentials_is_expired(self, bench):
+        credentials = SpotifyCredentials(expires_at=timezone.now() + timedelta(hours=1))
+        bench("credentials_is_expired", credentials.is_expired, number=10000)
+
+    @patch("app.services.spotify_service.SpotifyService.search_artists_raw", new_callable=AsyncMock)
+    def test_async_view_under_wsgi(self, mock_search, bench, factory):
+        # Coste completo de una vista async servida por WSGI: async_to_sync + dispatch + render.
+        mock_search.return_value = {"artists": {"items": []}}
+        view = SearchArtistView.as_view()
+        wrapped = async_to_sync(view)
+
+        def call():
+            request = factory.get("/spotify/search/artist", {"user_id": "1", "q": "rock"},
+                                  HTTP_X_API_KEY=settings.SECRET_KEY)
+            response = wrapped(request)
+            response.render()
+            return response
+
+        assert call().status_code == 200
+        bench("async_view_under_wsgi", call, number=200)
@@ -1,13 +1,47 @@
 import pytest
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
 from rest_framework.test import APIClient
 
+from app.db.routers import replica_monitor
+from app.models import User, SavedArtist, SavedTrack
+from app.spotify.cache import token_cache
+from app.spotify.client import search_cache
+from app.spotify.hedging import hedge_budget, latency_tracker
+from app.spotify.ratelimit import rate_limiter
+from app.spotify.resilience import reset_breakers
+from app.spotify.telemetry import telemetry
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption("--benchmark", action="store_true", default=False,
+                    help="Run the microbenchmarks in tests/benchmarks against the pinned baselines")
+    group.addoption("--benchmark-update", action="store_true", default=False,
+                    help="Run the microbenchmarks and rewrite tests/benchmarks/baselines.json")
+
 
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_spotify_caches():
+    token_cache.clear()
+    search_cache.clear()
+    rate_limiter.reset()
+    reset_breakers()
+    hedge_budget.reset()
+    latency_tracker.clear()
+    telemetry.reset()
+    caches[settings.USER_DETAIL_CACHE_ALIAS].clear()
+    yield
+    token_cache.clear()
+    search_cache.clear()
+
+
 @pytest.fixture
 def api_key():
     return settings.SECRET_KEY
@@ -39,3 +73,26 @@ def created_user(client, sample_user_payload):
     response = client.post("/users/", sample_user_payload, format='json')
     assert response.status_code == 201
     return response.data
+
+
+@pytest.fixture
+def sqlite_replica(settings, tmp_path):
+    # Segunda base de datos SQLite real como réplica, con su propio esquema y datos.
+    alias = "replica1"
+    connections.settings[alias] = connections.configure_settings({
+        **connections.settings,
+        alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": str(tmp_path / "replica.sqlite3")},
+    })[alias]
+    with connections[alias].schema_editor() as editor:
+        for model in (User, SavedArtist, SavedTrack):
+            editor.create_model(model)
+
+    settings.DB_REPLICAS = [alias]
+    settings.DB_REPLICA_LAG_QUERY = "SELECT 0"
+    settings.DATABASE_ROUTERS = ["app.db.routers.PrimaryReplicaRouter"]
+    replica_monitor.reset()
+    yield alias
+    replica_monitor.reset()
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
@@ -0,0 +1,206 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection, connections
+from django.test import RequestFactory
+
+from app.db import database_sync_to_async
+from app.db.connections import close_obsolete_connections
+from app.db.routers import PrimaryReplicaRouter, ReplicaMonitor, replica_monitor
+from app.middleware import ReadYourWritesMiddleware
+from app.models import User
+
+
+@database_sync_to_async
+def _thread_name():
+    return threading.current_thread().name
+
+
+@database_sync_to_async
+def _count_users():
+    return User.objects.count()
+
+
+class TestDatabaseSyncToAsync:
+
+    def test_default_mode_runs_on_thread_sensitive_executor(self, created_user):
+        assert async_to_sync(_count_users)() == 1
+        assert async_to_sync(_thread_name)() == threading.current_thread().name
+
+    def test_pool_mode_reuses_long_lived_threads(self, settings):
+        settings.DB_ASYNC_POOL_SIZE = 1
+
+        names = {async_to_sync(_thread_name)() for _ in range(3)}
+
+        assert len(names) == 1
+        assert names.pop().startswith("db-async")
+
+    def test_pool_mode_pings_reused_connection_once_per_call(self, settings):
+        # Los hilos del pool no reciben request_started: el health check se rearma en cada llamada.
+        settings.DB_ASYNC_POOL_SIZE = 1
+        select_one = database_sync_to_async(lambda: connection.cursor().execute("SELECT 1"))
+        close = database_sync_to_async(lambda: connection.close())
+        wrapper_class = type(connections["default"])
+
+        with patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True}), \
+                patch.object(wrapper_class, "is_usable", autospec=True, return_value=True) as mock_ping:
+            async_to_sync(close)()
+            for _ in range(3):
+                async_to_sync(select_one)()
+            async_to_sync(close)()
+
+        # La primera llamada abre la conexión; las dos siguientes la reutilizan y la comprueban.
+        assert mock_ping.call_count == 2
+
+    def test_obsolete_connections_are_checked_after_each_call(self):
+        with patch("app.db.connections.close_obsolete_connections") as mock_close:
+            async_to_sync(_thread_name)()
+        mock_close.assert_called_once()
+
+    @staticmethod
+    def _idle_connection(**state):
+        conn = MagicMock(in_atomic_block=False, errors_occurred=False, close_at=None, health_check_done=True,
+                         settings_dict={"AUTOCOMMIT": True})
+        conn.get_autocommit.return_value = True
+        for name, value in state.items():
+            setattr(conn, name, value)
+        return conn
+
+    def _check(self, conn):
+        with patch("app.db.connections.connections.all", return_value=[conn]):
+            close_obsolete_connections()
+
+    def test_healthy_connection_keeps_its_health_check(self):
+        # Sin ping por llamada: el health check solo se rearma al empezar/terminar la petición.
+        conn = self._idle_connection()
+        self._check(conn)
+        conn.is_usable.assert_not_called()
+        conn.close.assert_not_called()
+        assert conn.health_check_done is True
+
+    def test_expired_connection_is_closed(self):
+        conn = self._idle_connection(close_at=0.0)
+        self._check(conn)
+        conn.close.assert_called_once()
+
+    def test_connection_with_errors_is_pinged(self):
+        conn = self._idle_connection(errors_occurred=True)
+        conn.is_usable.return_value = False
+        self._check(conn)
+        conn.close.assert_called_once()
+
+    def test_connections_inside_atomic_block_are_left_open(self):
+        conn = self._idle_connection(in_atomic_block=True, close_at=0.0)
+        self._check(conn)
+        conn.close.assert_not_called()
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DB_REPLICAS = ["replica1", "replica2"]
+    replica_monitor.reset()
+    with patch.object(replica_monitor, "is_usable", side_effect=lambda alias: alias != "replica2") as mock_usable:
+        yield mock_usable
+    replica_monitor.reset()
+
+
+def _in_request(view, method="get"):
+    request = getattr(RequestFactory(), method)("/")
+    return ReadYourWritesMiddleware(lambda request: view())(request)
+
+
+class TestPrimaryReplicaRouter:
+
+    def test_reads_outside_a_request_use_primary(self, replicas):
+        assert PrimaryReplicaRouter().db_for_read(User) == "default"
+
+    def test_reads_in_a_request_use_a_usable_replica(self, replicas):
+        assert _in_request(lambda: PrimaryReplicaRouter().db_for_read(User)) == "replica1"
+
+    def test_request_reads_its_own_writes(self, replicas):
+        router = PrimaryReplicaRouter()
+
+        def view():
+            before = router.db_for_read(User)
+            assert router.db_for_write(User) == "default"
+            return before, router.db_for_read(User)
+
+        assert _in_request(view) == ("replica1", "default")
+        # El pin no se filtra a la siguiente petición.
+        assert _in_request(lambda: router.db_for_read(User)) == "replica1"
+
+    def test_unsafe_methods_read_from_primary_before_writing(self, replicas):
+        # PATCH/PUT/DELETE cargan el objeto que van a guardar: debe venir del primario.
+        for method in ("post", "put", "patch", "delete"):
+            assert _in_request(lambda: PrimaryReplicaRouter().db_for_read(User), method) == "default"
+
+    def test_falls_back_to_primary_when_no_replica_is_usable(self, replicas):
+        replicas.side_effect = lambda alias: False
+        assert _in_request(lambda: PrimaryReplicaRouter().db_for_read(User)) == "default"
+
+    def test_related_reads_follow_the_instance(self, replicas):
+        user = User(name="Replica User", age=30)
+        user._state.db = "replica1"
+        assert PrimaryReplicaRouter().db_for_read(User, instance=user) == "replica1"
+
+    def test_migrations_only_run_on_primary(self):
+        router = PrimaryReplicaRouter()
+        assert router.allow_migrate("default", "app")
+        assert not router.allow_migrate("replica1", "app")
+
+
+class TestReplicaRoutingEndToEnd:
+
+    @pytest.fixture
+    def stale_user(self, sqlite_replica):
+        # Mismo usuario en ambas bases; la réplica aún no ha recibido el último cambio de nombre.
+        user = User.objects.create(name="Primary Name", age=30)
+        User.objects.using(sqlite_replica).bulk_create([User(pk=user.pk, name="Stale Name", age=30, revision=1)])
+        return user
+
+    def test_get_reads_the_replica(self, client, stale_user):
+        response = client.get("/users/")
+
+        assert [user["name"] for user in response.data["results"]] == ["Stale Name"]
+
+    def test_update_loads_and_saves_primary_row(self, client, stale_user, sqlite_replica):
+        response = client.patch(f"/users/{stale_user.pk}/", {"age": 31}, format="json")
+
+        assert response.status_code == 200
+        assert response.data["name"] == "Primary Name"
+        assert User.objects.using("default").get(pk=stale_user.pk).name == "Primary Name"
+        assert User.objects.using(sqlite_replica).get(pk=stale_user.pk).age == 30
+
+    def test_reads_after_a_write_use_primary(self, stale_user):
+        def view():
+            before = User.objects.get(pk=stale_user.pk).name
+            User.objects.create(name="Another", age=40)
+            return before, User.objects.get(pk=stale_user.pk).name
+
+        assert _in_request(view) == ("Stale Name", "Primary Name")
+
+
+class TestReplicaMonitor:
+    # El alias "default" (SQLite en tests) hace de réplica para ejecutar la consulta de lag.
+
+    @pytest.mark.parametrize("query, usable", [
+        ("SELECT 0", True),
+        ("SELECT NULL", True),
+        ("SELECT 30", False),
+        ("SELECT lag FROM missing_table", False),
+    ])
+    def test_lag_probe(self, settings, query, usable):
+        settings.DB_REPLICA_LAG_QUERY = query
+        settings.DB_REPLICA_MAX_LAG_SECONDS = 5
+        assert ReplicaMonitor().is_usable("default") is usable
+
+    def test_probe_result_is_cached_for_check_interval(self, settings):
+        settings.DB_REPLICA_CHECK_INTERVAL = 60
+        settings.DB_REPLICA_LAG_QUERY = "SELECT 0"
+        monitor = ReplicaMonitor()
+
+        assert monitor.is_usable("default")
+        settings.DB_REPLICA_LAG_QUERY = "SELECT 30"
+        assert monitor.is_usable("default")
@@ -0,0 +1,111 @@
+import random
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+
+from app.loadtest import FakeSpotifyServer, issue_token, parse_latency, seed_users
+from app.loadtest.driver import percentile, summarize
+from app.spotify import client as spotify_client
+from app.services.spotify_service import SpotifyService
+from app.spotify.dtos import SpotifyTokenDTO, SpotifyTrackDTO
+
+
+@pytest.fixture
+def fake_spotify():
+    server = FakeSpotifyServer(seed=7).start()
+    yield server
+    server.stop()
+
+
+def _auth(ttl=3600):
+    return {"Authorization": f"Bearer {issue_token(ttl)['access_token']}"}
+
+
+class TestFakeSpotifyServer:
+
+    def test_search_and_following_pages(self, fake_spotify):
+        search = httpx.get(f"{fake_spotify.api_base}/search", params={"q": "rock", "type": "track", "limit": 3},
+                           headers=_auth())
+        assert search.status_code == 200
+        assert len(search.json()["tracks"]["items"]) == 3
+
+        page = httpx.get(f"{fake_spotify.api_base}/me/following", params={"type": "artist", "limit": 50},
+                         headers=_auth()).json()["artists"]
+        assert len(page["items"]) == 50
+        assert page["cursors"]["after"] == page["items"][-1]["id"]
+
+    def test_expired_token_is_rejected(self, fake_spotify):
+        resp = httpx.get(f"{fake_spotify.api_base}/search", params={"q": "rock", "type": "artist"},
+                         headers=_auth(ttl=-1))
+        assert resp.status_code == 401
+
+    def test_token_endpoint_issues_configured_ttl(self):
+        server = FakeSpotifyServer(token_ttl=120).start()
+        try:
+            resp = httpx.post(server.token_url, data={"grant_type": "refresh_token", "refresh_token": "r"})
+        finally:
+            server.stop()
+        token = SpotifyTokenDTO(**resp.json())
+        assert token.expires_in == 120
+        assert token.refresh_token is None
+
+    def test_injected_faults(self):
+        server = FakeSpotifyServer(rate_429=1.0, retry_after=3).start()
+        try:
+            resp = httpx.get(f"{server.api_base}/search", params={"q": "rock", "type": "artist"}, headers=_auth())
+        finally:
+            server.stop()
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "3"
+        assert server.stats() == {("GET /v1/search", 429): 1}
+
+    def test_latency_specs(self):
+        rng = random.Random(0)
+        assert parse_latency("none")(rng) == 0
+        assert parse_latency("fixed:40")(rng) == 0.04
+        assert 0.01 <= parse_latency("uniform:10:20")(rng) <= 0.02
+        with pytest.raises(ValueError):
+            parse_latency("gaussian:1")
+
+
+class TestClientAgainstFakeSpotify:
+
+    def test_client_follows_configured_urls(self, fake_spotify, settings):
+        settings.SPOTIFY_API_BASE = fake_spotify.api_base
+        settings.SPOTIFY_TOKEN_URL = fake_spotify.token_url
+        user_id = seed_users(1, token_ttl=-10)[0]
+
+        data = async_to_sync(spotify_client.search_artist)(user_id, "jazz")
+
+        assert len(data["artists"]["items"]) == 5
+        stats = fake_spotify.stats()
+        assert stats[("POST /api/token", 200)] == 1
+        assert stats[("GET /v1/search", 200)] == 1
+
+    def test_tracks_parse_into_dtos(self, fake_spotify, settings):
+        settings.SPOTIFY_API_BASE = fake_spotify.api_base
+        settings.SPOTIFY_TOKEN_URL = fake_spotify.token_url
+        user_id = seed_users(1, token_ttl=3600)[0]
+
+        search = async_to_sync(spotify_client.search_track)(user_id, "jazz")
+        compact = SpotifyService.compact_tracks(search, ["id", "artists"])
+        ids = [track["id"] for track in compact[:2]]
+        resolved = async_to_sync(SpotifyService.resolve_tracks_to_save)(user_id, [], ids)
+
+        assert len(compact) == 5
+        assert compact[0]["artists"][0]["uri"].startswith("spotify:artist:")
+        assert [type(track) for _, track in resolved] == [SpotifyTrackDTO, SpotifyTrackDTO]
+
+
+class TestLoadReport:
+
+    def test_percentiles_and_summary(self):
+        values = [i / 1000 for i in range(1, 101)]
+        assert percentile(values, 50) == 0.05
+        assert percentile(values, 99) == 0.099
+        assert percentile([], 95) == 0.0
+
+        rows = summarize({"search-artist": values}, {"search-artist": 2}, elapsed=2.0)
+        assert rows == [{"route": "search-artist", "requests": 100, "errors": 2, "rps": 50.0,
+                         "p50_ms": 50.0, "p95_ms": 95.0, "p99_ms": 99.0}]
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+from django.utils import timezone
+
+from app import metrics
+from app.models import SpotifyCredentials
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.registry.clear()
+
+
+def _server_timing(response):
+    entries = {}
+    for part in response["Server-Timing"].split(", "):
+        name, *params = part.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+class TestServerTiming:
+
+    def test_user_detail_reports_db_serialize_and_render(self, client, created_user):
+        response = client.get(f"/users/{created_user['id']}/")
+
+        timing = _server_timing(response)
+        assert {"db", "serialize", "render", "total"} <= set(timing)
+        assert timing["db"]["desc"].endswith('queries"')
+        assert float(timing["total"]["dur"]) >= float(timing["render"]["dur"])
+
+    def test_spotify_calls_are_attributed(self, client, created_user):
+        SpotifyCredentials.objects.create(
+            user_id=created_user["id"], access_token="token", refresh_token="refresh", token_type="Bearer",
+            expires_in=3600, expires_at=timezone.now() + timezone.timedelta(hours=1), scope="",
+        )
+        mock_client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"artists": {"items": []}})))
+
+        with patch("app.spotify.http.get_client", return_value=mock_client):
+            response = client.get("/spotify/search/artist", {"user_id": created_user["id"], "q": "muse"})
+
+        assert response.status_code == 200
+        assert _server_timing(response)["spotify"]["desc"] == '"1 calls"'
+
+    def test_header_can_be_disabled(self, client, settings):
+        settings.SERVER_TIMING_HEADER = False
+        response = client.get("/users/")
+        assert "Server-Timing" not in response
+
+
+class TestMetricsEndpoint:
+
+    def test_requires_api_key(self, unauthorized_client):
+        assert unauthorized_client.get("/metrics").status_code == 401
+
+    def test_exports_route_histograms(self, client, created_user):
+        client.get(f"/users/{created_user['id']}/")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert 'http_requests_total{route="user-list",method="POST",status="201"} 1' in body
+        assert 'http_request_duration_seconds_bucket{route="user-detail",method="GET",le="+Inf"} 1' in body
+        assert 'phase="db"' in body
+
+
+class TestHistogram:
+
+    def test_cumulative_buckets(self):
+        histogram = metrics.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+        assert histogram.sum == pytest.approx(3.65)
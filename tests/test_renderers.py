@@ -0,0 +1,41 @@
+import datetime
+import io
+from decimal import Decimal
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from app.api.parsers import FastJSONParser
+from app.api.renderers import FastJSONRenderer
+
+FAST_JSON = {
+    'DEFAULT_RENDERER_CLASSES': ['app.api.renderers.FastJSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['app.api.parsers.FastJSONParser'],
+}
+
+
+class TestFastJSON:
+
+    def test_output_matches_drf_renderer(self):
+        data = {"name": "Bjørk", "ids": [1, 2], "nested": {"ok": True, "none": None}, "sep": "a b"}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_handles_datetime_and_decimal(self):
+        data = {"when": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc), "price": Decimal("1.50")}
+        assert FastJSONRenderer().render(data) == b'{"when":"2024-01-02T03:04:05Z","price":1.5}'
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_parser_round_trip_and_errors(self):
+        assert FastJSONParser().parse(io.BytesIO(b'{"ids":["a","b"]}')) == {"ids": ["a", "b"]}
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"ids":'))
+
+    def test_user_routes_with_fast_json(self, client, sample_user_payload, settings):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, **FAST_JSON}
+
+        created = client.post("/users/", sample_user_payload, format='json')
+        fetched = client.get(f"/users/{created.data['id']}/")
+
+        assert created.status_code == 201
+        assert fetched.json() == {**created.json(), "favorite_artists": [], "favorite_tracks": []}
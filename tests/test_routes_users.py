@@ -1,3 +1,11 @@
+from types import SimpleNamespace
+
+from asgiref.sync import async_to_sync
+
+from app.models import User, SavedArtist, SavedTrack
+from app.services.user_service import UserService
+
+
 def test_create_user_success(client, sample_user_payload):
     response = client.post("/users/", sample_user_payload, format='json')
     assert response.status_code == 201
@@ -40,3 +48,164 @@ def test_delete_user(client, created_user):
 
     get_response = client.get(f"/users/{user_id}/")
     assert get_response.status_code == 404
+
+
+def test_list_users_query_count_is_constant(client, django_assert_num_queries):
+    for i in range(5):
+        user = User.objects.create(name=f"User {i}", age=30)
+        SavedArtist.objects.create(user=user, spotify_id=f"a{i}", name="Artist")
+        SavedTrack.objects.create(user=user, spotify_id=f"t{i}", name="Track")
+
+    with django_assert_num_queries(3):
+        response = client.get("/users/")
+
+    assert response.status_code == 200
+    assert len(response.data["results"]) == 5
+    assert all(len(user["favorite_artists"]) == 1 for user in response.data["results"])
+
+
+def test_list_users_is_cursor_paginated(client):
+    for i in range(3):
+        User.objects.create(name=f"User {i}", age=30)
+
+    first_page = client.get("/users/?page_size=2")
+    assert [user["name"] for user in first_page.data["results"]] == ["User 0", "User 1"]
+    assert first_page.data["next"] is not None
+
+    second_page = client.get(first_page.data["next"])
+    assert [user["name"] for user in second_page.data["results"]] == ["User 2"]
+    assert second_page.data["next"] is None
+
+
+def test_get_user_returns_etag_and_304_when_unchanged(client, created_user, django_assert_num_queries, settings):
+    settings.USER_DETAIL_CACHE_TTL = 0
+    user_id = created_user["id"]
+    first = client.get(f"/users/{user_id}/")
+    etag = first["ETag"]
+    assert "Last-Modified" in first
+
+    with django_assert_num_queries(1):
+        cached = client.get(f"/users/{user_id}/", HTTP_IF_NONE_MATCH=etag)
+
+    assert cached.status_code == 304
+    assert cached["ETag"] == etag
+
+
+def test_favorite_write_changes_etag(client, created_user):
+    user_id = created_user["id"]
+    etag = client.get(f"/users/{user_id}/")["ETag"]
+
+    SavedArtist.objects.create(user_id=user_id, spotify_id="a1", name="Artist")
+
+    response = client.get(f"/users/{user_id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert len(response.data["favorite_artists"]) == 1
+
+
+def test_favorite_delete_changes_etag(client, created_user):
+    user_id = created_user["id"]
+    track = SavedTrack.objects.create(user_id=user_id, spotify_id="t1", name="Track")
+    etag = client.get(f"/users/{user_id}/")["ETag"]
+
+    track.delete()
+
+    assert client.get(f"/users/{user_id}/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_bulk_favorite_delete_bumps_revision_once(created_user):
+    user_id = created_user["id"]
+    SavedArtist.objects.bulk_create([SavedArtist(user_id=user_id, spotify_id=f"a{i}", name="A") for i in range(5)])
+    revision = User.objects.get(pk=user_id).revision
+
+    SavedArtist.objects.filter(user_id=user_id).delete()
+
+    assert User.objects.get(pk=user_id).revision == revision + 1
+
+
+def test_user_delete_does_not_bump_its_favorites(created_user, django_assert_max_num_queries):
+    user = User.objects.get(pk=created_user["id"])
+    SavedArtist.objects.bulk_create([SavedArtist(user=user, spotify_id=f"a{i}", name="A") for i in range(50)])
+    SavedTrack.objects.bulk_create([SavedTrack(user=user, spotify_id=f"t{i}", name="T") for i in range(50)])
+
+    with django_assert_max_num_queries(10):
+        user.delete()
+
+    assert not SavedArtist.objects.exists()
+    assert not SavedTrack.objects.exists()
+
+
+def test_save_does_not_reuse_a_concurrent_revision(created_user):
+    user = User.objects.get(pk=created_user["id"])
+    User.bump_revision(user.pk)
+
+    user.name = "Stale Instance"
+    user.save()
+
+    assert user.revision == 3
+    assert User.objects.get(pk=user.pk).revision == 3
+
+
+class TestUserDetailCache:
+
+    def test_second_get_is_served_without_queries(self, client, created_user, django_assert_num_queries):
+        user_id = created_user["id"]
+        first = client.get(f"/users/{user_id}/")
+
+        with django_assert_num_queries(0):
+            second = client.get(f"/users/{user_id}/")
+
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert second["ETag"] == first["ETag"]
+        assert second["Last-Modified"] == first["Last-Modified"]
+
+    def test_conditional_get_hits_cache(self, client, created_user, django_assert_num_queries):
+        user_id = created_user["id"]
+        etag = client.get(f"/users/{user_id}/")["ETag"]
+
+        with django_assert_num_queries(0):
+            response = client.get(f"/users/{user_id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+    def test_user_update_invalidates(self, client, created_user):
+        user_id = created_user["id"]
+        client.get(f"/users/{user_id}/")
+
+        client.patch(f"/users/{user_id}/", {"name": "Renamed"}, format="json")
+
+        assert client.get(f"/users/{user_id}/").data["name"] == "Renamed"
+
+    def test_saved_artist_signal_invalidates(self, client, created_user):
+        user_id = created_user["id"]
+        client.get(f"/users/{user_id}/")
+
+        SavedArtist.objects.create(user_id=user_id, spotify_id="a1", name="Artist")
+
+        assert len(client.get(f"/users/{user_id}/").data["favorite_artists"]) == 1
+
+    def test_bulk_favorites_invalidate(self, client, created_user):
+        user_id = created_user["id"]
+        client.get(f"/users/{user_id}/")
+
+        user = User.objects.get(pk=user_id)
+        async_to_sync(UserService.add_favorite_tracks_bulk)(user, [SimpleNamespace(id="t1", name="Track")])
+
+        assert len(client.get(f"/users/{user_id}/").data["favorite_tracks"]) == 1
+
+    def test_miss_is_loaded_from_primary(self, client, sqlite_replica):
+        user = User.objects.create(name="Primary Name", age=30)
+        User.objects.using(sqlite_replica).bulk_create([User(pk=user.pk, name="Stale Name", age=30, revision=1)])
+
+        assert client.get(f"/users/{user.pk}/").data["name"] == "Primary Name"
+        assert client.get(f"/users/{user.pk}/").data["name"] == "Primary Name"
+
+    def test_user_delete_invalidates(self, client, created_user):
+        user_id = created_user["id"]
+        client.get(f"/users/{user_id}/")
+
+        client.delete(f"/users/{user_id}/")
+
+        assert client.get(f"/users/{user_id}/").status_code == 404
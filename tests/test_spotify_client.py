@@ -0,0 +1,617 @@
+import asyncio
+import gc
+import json
+import logging
+from io import StringIO
+from unittest.mock import patch, AsyncMock
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.utils import timezone
+
+from app.errors import ExternalAPIError
+from app.loadtest import FakeSpotifyServer
+from app.log import NonBlockingHandler
+from app.models import User, SpotifyCredentials
+from app.services.spotify_service import SpotifyService
+from app.spotify import auth, client as spotify_client, http
+from app.spotify.cache import LRUTTLCache, token_cache
+from app.spotify.dtos import SpotifyTokenDTO
+from app.spotify.hedging import hedge_delay, latency_tracker
+from app.spotify.ratelimit import SpotifyRateLimiter
+from app.spotify.resilience import CircuitBreaker, get_breaker
+from app.spotify.telemetry import telemetry
+
+
+class TestPooledHttpClient:
+
+    def test_client_is_reused_within_loop(self):
+        async def _get_twice():
+            first = http.get_client()
+            second = http.get_client()
+            await http.aclose_client()
+            return first, second
+
+        first, second = async_to_sync(_get_twice)()
+        assert first is second
+        assert first.is_closed
+
+    def test_client_uses_configured_limits(self, settings):
+        settings.SPOTIFY_HTTP_MAX_CONNECTIONS = 7
+        settings.SPOTIFY_HTTP_TIMEOUT = 3.0
+
+        async def _build():
+            client = http.get_client()
+            timeout = client.timeout
+            pool = client._transport._pool
+            await http.aclose_client()
+            return timeout, pool
+
+        timeout, pool = async_to_sync(_build)()
+        assert timeout.read == 3.0
+        assert pool._max_connections == 7
+
+    def test_clients_of_finished_loops_are_closed(self):
+        # Bajo WSGI cada async_to_sync usa un loop nuevo: su cliente no debe quedar abierto.
+        server = FakeSpotifyServer().start()
+        build, built = http._build_client, []
+
+        def _build():
+            built.append(build())
+            return built[-1]
+
+        async def _call():
+            return (await http.get_client().get(f"{server.api_base}/search")).status_code
+
+        try:
+            with patch("app.spotify.http._build_client", side_effect=_build):
+                statuses = [async_to_sync(_call)() for _ in range(3)]
+        finally:
+            server.stop()
+        gc.collect()
+
+        assert statuses == [401, 401, 401]
+        assert len(built) == 3
+        assert all(client.is_closed for client in built)
+        assert len(http._clients) == 0
+
+    def test_lifespan_shutdown_closes_client(self):
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def _run():
+            client = http.get_client()
+            await http.LifespanMiddleware(None)({"type": "lifespan"}, receive, send)
+            return client
+
+        client = asyncio.run(_run())
+        assert client.is_closed
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+
+@pytest.fixture
+def spotify_user():
+    return User.objects.create(name="Token User", age=30)
+
+
+def make_credentials(user, expires_in_seconds):
+    return SpotifyCredentials.objects.create(
+        user=user,
+        access_token="old-token",
+        refresh_token="refresh",
+        token_type="Bearer",
+        expires_in=3600,
+        expires_at=timezone.now() + timezone.timedelta(seconds=expires_in_seconds),
+        scope="user-follow-read",
+    )
+
+
+def new_token_dto():
+    return SpotifyTokenDTO(access_token="new-token", token_type="Bearer", expires_in=3600, scope="user-follow-read")
+
+
+class TestSingleFlightRefresh:
+
+    def test_concurrent_requests_share_one_refresh(self, spotify_user):
+        make_credentials(spotify_user, expires_in_seconds=-10)
+
+        async def _slow_refresh(_refresh_token):
+            await asyncio.sleep(0.05)
+            return new_token_dto()
+
+        async def _burst():
+            return await asyncio.gather(*[spotify_client._ensure_valid_token_for_user(spotify_user.id) for _ in range(5)])
+
+        with patch("app.spotify.client.refresh_token_with_refresh_token", side_effect=_slow_refresh) as mock_refresh:
+            tokens = async_to_sync(_burst)()
+
+        assert tokens == ["new-token"] * 5
+        assert mock_refresh.call_count == 1
+        creds = SpotifyCredentials.objects.get(user=spotify_user)
+        assert creds.access_token == "new-token"
+        assert creds.refresh_lease_until is None
+
+    def test_lease_held_by_other_worker_skips_refresh(self, spotify_user, settings):
+        settings.SPOTIFY_REFRESH_LEASE_SECONDS = 1
+        creds = make_credentials(spotify_user, expires_in_seconds=-10)
+        SpotifyCredentials.objects.filter(pk=creds.pk).update(
+            refresh_lease_until=timezone.now() + timezone.timedelta(seconds=30)
+        )
+
+        async def _other_worker_finishes():
+            await asyncio.sleep(0.05)
+            await spotify_client.update_credentials(creds, new_token_dto())
+
+        async def _run():
+            token, _ = await asyncio.gather(
+                spotify_client._ensure_valid_token_for_user(spotify_user.id),
+                _other_worker_finishes(),
+            )
+            return token
+
+        with patch("app.spotify.client.REFRESH_POLL_INTERVAL", 0.01), \
+                patch("app.spotify.client.refresh_token_with_refresh_token", new_callable=AsyncMock) as mock_refresh:
+            token = async_to_sync(_run)()
+
+        assert token == "new-token"
+        mock_refresh.assert_not_called()
+
+
+class TestProactiveRefresher:
+
+    def test_command_refreshes_only_tokens_inside_window(self, spotify_user):
+        other_user = User.objects.create(name="Fresh User", age=40)
+        expiring = make_credentials(spotify_user, expires_in_seconds=120)
+        fresh = make_credentials(other_user, expires_in_seconds=3000)
+        out = StringIO()
+
+        with patch("app.spotify.refresher.refresh_token_with_refresh_token", new_callable=AsyncMock) as mock_refresh:
+            mock_refresh.return_value = new_token_dto()
+            call_command("refresh_spotify_tokens", "--lookahead=600", stdout=out)
+
+        assert mock_refresh.call_count == 1
+        assert "refreshed=1" in out.getvalue()
+        expiring.refresh_from_db()
+        fresh.refresh_from_db()
+        assert expiring.access_token == "new-token"
+        assert expiring.refresh_lease_until is None
+        assert fresh.access_token == "old-token"
+
+    def test_command_skips_rows_leased_by_other_worker(self, spotify_user):
+        creds = make_credentials(spotify_user, expires_in_seconds=120)
+        SpotifyCredentials.objects.filter(pk=creds.pk).update(
+            refresh_lease_until=timezone.now() + timezone.timedelta(seconds=30)
+        )
+        out = StringIO()
+
+        with patch("app.spotify.refresher.refresh_token_with_refresh_token", new_callable=AsyncMock) as mock_refresh:
+            call_command("refresh_spotify_tokens", stdout=out)
+
+        mock_refresh.assert_not_called()
+        assert "skipped=1" in out.getvalue()
+
+
+class TestTokenCache:
+
+    def test_lru_evicts_oldest_and_expires_entries(self):
+        cache = LRUTTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+        cache.set("c", 3, ttl=0)
+        assert cache.get("c") is None
+        assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 2, "misses": 2}
+
+    def test_cached_token_skips_database(self, spotify_user, django_assert_num_queries):
+        make_credentials(spotify_user, expires_in_seconds=3600)
+        assert async_to_sync(spotify_client._ensure_valid_token_for_user)(spotify_user.id) == "old-token"
+
+        with django_assert_num_queries(0):
+            token = async_to_sync(spotify_client._ensure_valid_token_for_user)(spotify_user.id)
+
+        assert token == "old-token"
+
+    def test_auth_callback_invalidates_cached_token(self, spotify_user):
+        make_credentials(spotify_user, expires_in_seconds=3600)
+        async_to_sync(spotify_client._ensure_valid_token_for_user)(spotify_user.id)
+
+        with patch("app.spotify.auth.exchange_code_for_token", new_callable=AsyncMock) as mock_exchange:
+            mock_exchange.return_value = new_token_dto()
+            assert async_to_sync(SpotifyService.process_auth_callback)("code", spotify_user.id)
+
+        assert token_cache.get(spotify_user.id) is None
+        assert async_to_sync(spotify_client._ensure_valid_token_for_user)(spotify_user.id) == "new-token"
+
+    def test_shared_database_cache_is_used_from_async_code(self, spotify_user, settings):
+        # DatabaseCache lanza SynchronousOnlyOperation si se consulta en síncrono desde el event loop.
+        settings.CACHES = {**settings.CACHES, "tokens": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "spotify_token_cache",
+        }}
+        settings.SPOTIFY_TOKEN_CACHE_ALIAS = "tokens"
+        call_command("createcachetable", "spotify_token_cache", verbosity=0)
+        make_credentials(spotify_user, expires_in_seconds=3600)
+
+        assert async_to_sync(spotify_client._ensure_valid_token_for_user)(spotify_user.id) == "old-token"
+        assert token_cache.get(spotify_user.id) == "old-token"
+
+        with patch("app.spotify.auth.exchange_code_for_token", new_callable=AsyncMock) as mock_exchange:
+            mock_exchange.return_value = new_token_dto()
+            assert async_to_sync(SpotifyService.process_auth_callback)("code", spotify_user.id)
+
+        assert token_cache.get(spotify_user.id) is None
+
+
+class TestSearchCache:
+
+    def test_normalized_queries_share_one_upstream_call(self, spotify_user):
+        make_credentials(spotify_user, expires_in_seconds=3600)
+        payload = {"artists": {"items": [{"id": "1", "name": "Daft Punk", "href": "h", "uri": "u"}]}}
+
+        async def _search_twice():
+            first = await spotify_client.search_artist(spotify_user.id, "  Daft   PUNK ")
+            second = await spotify_client.search_artist(spotify_user.id, "daft punk")
+            return first, second
+
+        with patch("app.spotify.client._spotify_get", new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = payload
+            first, second = async_to_sync(_search_twice)()
+
+        assert first == second == payload
+        mock_get.assert_called_once()
+        assert spotify_client.search_cache.stats()["hits"] == 1
+
+    def test_errors_and_other_keys_are_not_shared(self, spotify_user):
+        make_credentials(spotify_user, expires_in_seconds=3600)
+
+        async def _searches():
+            await spotify_client.search_artist(spotify_user.id, "daft punk")
+            await spotify_client.search_artist(spotify_user.id, "daft punk")
+            await spotify_client.search_track(spotify_user.id, "daft punk")
+            await spotify_client.search_artist(spotify_user.id, "daft punk", market="ES")
+
+        with patch("app.spotify.client._spotify_get", new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = {"error": "token_expired_or_invalid"}
+            async_to_sync(_searches)()
+
+        assert mock_get.call_count == 4
+
+
+class TestChunkedFanOut:
+
+    def test_contains_is_split_in_chunks_and_merged_in_order(self, spotify_user):
+        make_credentials(spotify_user, expires_in_seconds=3600)
+        ids = [f"id{i}" for i in range(120)]
+
+        async def _fake_get(token, path, params=None, hedge=False):
+            chunk = params["ids"].split(",")
+            # el último chunk (más corto) responde antes para comprobar que se respeta el orden
+            await asyncio.sleep(0.001 * len(chunk))
+            return [item.endswith("0") for item in chunk]
+
+        with patch("app.spotify.client._spotify_get", side_effect=_fake_get) as mock_get:
+            result = async_to_sync(spotify_client.check_following_status)(spotify_user.id, ids, "artist")
+
+        assert mock_get.call_count == 3
+        assert [len(call.kwargs["params"]["ids"].split(",")) for call in mock_get.call_args_list] == [50, 50, 20]
+        assert result == [item.endswith("0") for item in ids]
+
+    def test_follow_reports_error_if_any_chunk_fails(self, spotify_user):
+        make_credentials(spotify_user, expires_in_seconds=3600)
+        ids = [f"id{i}" for i in range(60)]
+
+        with patch("app.spotify.client._spotify_put", new_callable=AsyncMock) as mock_put:
+            mock_put.side_effect = [True, RuntimeError("boom")]
+            result = async_to_sync(spotify_client.follow_ids)(spotify_user.id, ids, "artist")
+
+        assert mock_put.call_count == 2
+        assert result == {"error": "boom"}
+
+
+def mock_http(handler):
+    mock_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return patch("app.spotify.http.get_client", return_value=mock_client)
+
+
+class TestRateLimiting:
+
+    def test_429_waits_for_retry_after_and_retries(self):
+        responses = [httpx.Response(429, headers={"Retry-After": "0.05"}), httpx.Response(200, json={"ok": True})]
+
+        with mock_http(lambda request: responses.pop(0)):
+            data = async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert data == {"ok": True}
+        assert responses == []
+
+    def test_retry_after_beyond_max_wait_fails_fast(self, settings):
+        settings.SPOTIFY_RATE_LIMIT_MAX_WAIT = 1.0
+
+        with mock_http(lambda request: httpx.Response(429, headers={"Retry-After": "30"})):
+            with pytest.raises(ExternalAPIError):
+                async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+    def test_persistent_429_is_capped(self, settings):
+        settings.SPOTIFY_RATE_LIMIT_RETRIES = 2
+        calls = []
+
+        def _throttled(request):
+            calls.append(request)
+            return httpx.Response(429, headers={"Retry-After": "0"})
+
+        with mock_http(_throttled):
+            with pytest.raises(ExternalAPIError, match="still rate limited after 2 retries"):
+                async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert len(calls) == 3
+
+    def test_local_bucket_paces_bursts(self, settings):
+        settings.SPOTIFY_RATE_LIMIT_PER_SECOND = 10
+        settings.SPOTIFY_RATE_LIMIT_BURST = 2
+        limiter = SpotifyRateLimiter()
+
+        assert limiter._take_local() == 0
+        assert limiter._take_local() == 0
+        assert 0 < limiter._take_local() <= 0.1
+
+    def test_shared_mode_publishes_block_to_cache(self, settings):
+        settings.SPOTIFY_RATE_LIMIT_CACHE_ALIAS = "default"
+        limiter = SpotifyRateLimiter()
+        other_worker = SpotifyRateLimiter()
+
+        async def _penalize_and_check():
+            await limiter.penalize(5)
+            return await other_worker._next_wait()
+
+        assert async_to_sync(_penalize_and_check)() > 4
+
+
+class TestRetriesAndCircuitBreaker:
+
+    def test_transient_5xx_is_retried(self, settings):
+        settings.SPOTIFY_RETRY_BACKOFF_BASE = 0.001
+        responses = [httpx.Response(503), httpx.Response(200, json={"ok": True})]
+
+        with mock_http(lambda request: responses.pop(0)):
+            assert async_to_sync(spotify_client._spotify_get)("token", "/search") == {"ok": True}
+
+    def test_timeouts_exhaust_retries_with_external_api_error(self, settings):
+        settings.SPOTIFY_RETRY_ATTEMPTS = 2
+        settings.SPOTIFY_RETRY_BACKOFF_BASE = 0.001
+        calls = []
+
+        def _timeout(request):
+            calls.append(request)
+            raise httpx.ReadTimeout("slow", request=request)
+
+        with mock_http(_timeout):
+            with pytest.raises(ExternalAPIError, match="3 attempt"):
+                async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert len(calls) == 3
+
+    def test_open_circuit_fails_fast_without_calling_upstream(self, settings):
+        settings.SPOTIFY_RETRY_ATTEMPTS = 0
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 2
+        calls = []
+
+        def _down(request):
+            calls.append(request)
+            return httpx.Response(500)
+
+        with mock_http(_down):
+            for _ in range(3):
+                with pytest.raises(ExternalAPIError):
+                    async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert len(calls) == 2
+        assert get_breaker("GET /search").is_open
+
+    def test_half_open_probe_closes_circuit(self, settings):
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 1
+        settings.SPOTIFY_BREAKER_RESET_TIMEOUT = 0
+        breaker = get_breaker("GET /search")
+        breaker.record_failure()
+
+        with mock_http(lambda request: httpx.Response(200, json={})):
+            async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_probe_rate_limited_then_succeeds(self, settings):
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 1
+        settings.SPOTIFY_BREAKER_RESET_TIMEOUT = 0
+        breaker = get_breaker("GET /search")
+        breaker.record_failure()
+        responses = [httpx.Response(429, headers={"Retry-After": "0"})] + [httpx.Response(200, json={})] * 3
+
+        with mock_http(lambda request: responses.pop(0)):
+            for _ in range(3):
+                async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert responses == []
+
+    def test_probe_without_outcome_reopens_circuit(self, settings):
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 1
+        settings.SPOTIFY_BREAKER_RESET_TIMEOUT = 0
+        settings.SPOTIFY_RATE_LIMIT_MAX_WAIT = 1.0
+        breaker = get_breaker("GET /search")
+        breaker.record_failure()
+
+        with mock_http(lambda request: httpx.Response(429, headers={"Retry-After": "30"})):
+            with pytest.raises(ExternalAPIError, match="rate limit"):
+                async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_cancelled_probe_reopens_circuit(self, settings):
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 1
+        settings.SPOTIFY_BREAKER_RESET_TIMEOUT = 0
+        breaker = get_breaker("GET /search")
+        breaker.record_failure()
+
+        async def _slow(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={})
+
+        async def _cancel_probe():
+            task = asyncio.ensure_future(spotify_client._spotify_get("token", "/search"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with mock_http(_slow):
+            async_to_sync(_cancel_probe)()
+
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_stale_half_open_allows_new_probe(self, settings):
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 1
+        settings.SPOTIFY_BREAKER_RESET_TIMEOUT = 0
+        settings.SPOTIFY_BREAKER_PROBE_TIMEOUT = 0
+        breaker = get_breaker("GET /search")
+        breaker.record_failure()
+
+        assert breaker.before_call() is True
+        assert breaker.before_call() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+class TestHedgedRequests:
+
+    @pytest.fixture
+    def hedging_settings(self, settings):
+        settings.SPOTIFY_HEDGE_ENABLED = True
+        settings.SPOTIFY_HEDGE_DELAY = 0.02
+        settings.SPOTIFY_HEDGE_BUDGET_RATIO = 1.0
+        return settings
+
+    @staticmethod
+    def slow_first_handler(calls):
+        async def _handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(1)
+                return httpx.Response(200, json={"from": "primary"})
+            return httpx.Response(200, json={"from": "hedge"})
+        return _handler
+
+    def test_slow_primary_is_hedged(self, hedging_settings):
+        calls = []
+        with mock_http(self.slow_first_handler(calls)):
+            data = async_to_sync(spotify_client._spotify_get)("token", "/search", hedge=True)
+
+        assert data == {"from": "hedge"}
+        assert len(calls) == 2
+
+    def test_hedging_respects_budget(self, hedging_settings):
+        hedging_settings.SPOTIFY_HEDGE_BUDGET_RATIO = 0.0
+        hedging_settings.SPOTIFY_HEDGE_DELAY = 0.01
+        calls = []
+
+        async def _handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"from": "primary"})
+
+        with mock_http(_handler):
+            data = async_to_sync(spotify_client._spotify_get)("token", "/search", hedge=True)
+
+        assert data == {"from": "primary"}
+        assert len(calls) == 1
+
+    def test_delay_follows_observed_percentile(self, hedging_settings):
+        for _ in range(50):
+            latency_tracker.record("GET /search", 0.2)
+
+        assert hedge_delay("GET /search") == 0.2
+        assert hedge_delay("GET /me/following/contains") == 0.02
+
+
+@pytest.fixture
+def fake_spotify_url():
+    server = FakeSpotifyServer().start()
+    yield server.api_base
+    server.stop()
+
+
+class TestOutboundTelemetry:
+
+    def test_calls_statuses_retries_and_bytes_are_recorded(self, settings):
+        settings.SPOTIFY_RETRY_BACKOFF_BASE = 0.001
+        responses = [httpx.Response(503), httpx.Response(200, json={"ok": True})]
+
+        with mock_http(lambda request: responses.pop(0)):
+            async_to_sync(spotify_client._spotify_get)("token", "/search")
+
+        stats = telemetry.snapshot()["paths"]["GET /search"]
+        assert stats["calls"] == 2
+        assert stats["statuses"] == {503: 1, 200: 1}
+        assert stats["retries"] == {"server_error": 1}
+
+    def test_pool_wait_and_bytes_are_measured_on_real_connections(self, fake_spotify_url, settings):
+        settings.SPOTIFY_API_BASE = fake_spotify_url
+
+        async def _call():
+            try:
+                return await spotify_client._spotify_get("token", "/search")
+            finally:
+                await http.aclose_client()
+
+        async_to_sync(_call)()
+
+        stats = telemetry.snapshot()["paths"]["GET /search"]
+        assert stats["pool_wait_buckets"]["+Inf"] == 1
+        assert stats["bytes_received"] > 0
+
+    def test_refresh_outcomes_are_counted(self):
+        with mock_http(lambda request: httpx.Response(400, json={"error": "invalid_grant"})):
+            assert async_to_sync(auth.refresh_token_with_refresh_token)("bad") is None
+        with mock_http(lambda request: httpx.Response(200, json=new_token_dto().model_dump())):
+            assert async_to_sync(auth.refresh_token_with_refresh_token)("good").access_token == "new-token"
+
+        assert telemetry.snapshot()["refreshes"] == {"rejected": 1, "refreshed": 1}
+        assert telemetry.snapshot()["paths"]["POST /api/token"]["statuses"] == {400: 1, 200: 1}
+
+    def test_prometheus_export(self, client):
+        with mock_http(lambda request: httpx.Response(200, json={})):
+            async_to_sync(spotify_client._spotify_get)("token", "/me/following")
+
+        body = client.get("/metrics").content.decode()
+
+        assert 'spotify_request_duration_seconds_count{path="GET /me/following"} 1' in body
+        assert 'spotify_responses_total{path="GET /me/following",status="200"} 1' in body
+
+
+class TestStructuredLogging:
+
+    def test_records_are_written_as_json_from_the_listener_thread(self, capsys):
+        handler = NonBlockingHandler()
+        logger = logging.getLogger("app.tests.structured")
+        logger.addHandler(handler)
+        try:
+            logger.warning("Retrying %s", "call", extra={"path": "GET /search"})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        payload = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+
+        assert payload["event"] == "Retrying call"
+        assert payload["level"] == "WARNING"
+        assert payload["path"] == "GET /search"
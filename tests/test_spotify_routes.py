@@ -1,6 +1,19 @@
+import json
 from unittest.mock import patch, AsyncMock
 
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.utils import timezone
+from pydantic import ValidationError
+
+from app.api.views import SearchArtistView, FavoriteArtistView, SpotifyCallbackView, BulkFavoriteArtistsView
+from app.errors import ExternalAPIError
+from app.models import SavedArtist, SpotifyCredentials, User
+from app.services.spotify_service import SpotifyService
 from app.spotify import SpotifyArtistDTO
+from app.spotify.resilience import get_breaker
 
 MOCK_ARTIST = SpotifyArtistDTO(
     id="123", name="Mock Band", href="http://api/1", uri="spotify:artist:1"
@@ -74,3 +87,257 @@ class TestSpotifyIntegration:
 
         assert response.status_code == 200
         mock_follow.assert_called_once()
+
+
+class TestUpstreamUnavailable:
+    # Con el circuito abierto las vistas devuelven el 502 de custom_exception_handler.
+
+    @pytest.fixture
+    def open_circuit(self, settings, created_user):
+        settings.SPOTIFY_BREAKER_FAILURE_THRESHOLD = 1
+        settings.SPOTIFY_BREAKER_RESET_TIMEOUT = 60
+        SpotifyCredentials.objects.create(
+            user_id=created_user["id"], access_token="token", refresh_token="refresh", token_type="Bearer",
+            expires_in=3600, expires_at=timezone.now() + timezone.timedelta(hours=1), scope="",
+        )
+
+        def _open(endpoint):
+            get_breaker(endpoint).record_failure()
+        return _open
+
+    def test_follow_returns_502(self, client, created_user, open_circuit):
+        open_circuit("PUT /me/following")
+
+        response = client.put(f"/spotify/me/following?user_id={created_user['id']}&type=artist",
+                              {"ids": ["id1"]}, format="json")
+
+        assert response.status_code == 502
+        assert "circuit open" in response.data["message"]
+
+    def test_single_favorite_returns_502(self, client, created_user, open_circuit):
+        open_circuit("GET /search")
+
+        for kind, param in (("artists", "artist_name"), ("tracks", "track_name")):
+            response = client.post(f"/users/{created_user['id']}/favorites/{kind}/?{param}=Muse")
+            assert response.status_code == 502
+
+
+class TestAsyncViews:
+
+    def test_spotify_and_favorite_views_are_async(self):
+        assert SearchArtistView.view_is_async
+        assert FavoriteArtistView.view_is_async
+        assert SpotifyCallbackView.view_is_async
+
+    @patch("app.services.spotify_service.SpotifyService.search_artists_raw", new_callable=AsyncMock)
+    async def test_search_artist_under_asgi(self, mock_search, api_key):
+        mock_search.return_value = {"artists": {"items": []}}
+        response = await AsyncClient().get(
+            "/spotify/search/artist?user_id=1&q=band&market=ES", headers={"x-api-key": api_key}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"artists": {"items": []}}
+        mock_search.assert_awaited_once_with(1, "band", "ES")
+
+    async def test_async_view_still_checks_api_key(self):
+        response = await AsyncClient().get("/spotify/search/artist?user_id=1&q=band")
+        assert response.status_code == 401
+
+
+class TestBulkFavorites:
+
+    @patch.object(BulkFavoriteArtistsView, "resolve", new_callable=AsyncMock)
+    def test_bulk_add_artists_reports_each_item(self, mock_resolve, client, created_user):
+        user_id = created_user["id"]
+        mock_resolve.return_value = [("Band", MOCK_ARTIST), ("Nobody", None), ("123", MOCK_ARTIST)]
+
+        response = client.post(f"/users/{user_id}/favorites/artists/bulk/",
+                               {"names": ["Band", "Nobody"], "ids": ["123"]}, format='json')
+
+        assert response.status_code == 200
+        assert response.data["saved"] == 2
+        assert [item["status"] for item in response.data["items"]] == ["saved", "not_found", "saved"]
+        mock_resolve.assert_awaited_once_with(user_id, ["Band", "Nobody"], ["123"])
+
+        user_resp = client.get(f"/users/{user_id}/")
+        assert len(user_resp.data["favorite_artists"]) == 1
+
+    @patch.object(BulkFavoriteArtistsView, "resolve", new_callable=AsyncMock)
+    def test_bulk_add_reports_already_saved_separately(self, mock_resolve, client, created_user):
+        user_id = created_user["id"]
+        SavedArtist.objects.create(user_id=user_id, spotify_id=MOCK_ARTIST.id, name=MOCK_ARTIST.name)
+        other = MOCK_ARTIST.model_copy(update={"id": "456"})
+        mock_resolve.return_value = [("123", MOCK_ARTIST), ("456", other)]
+        revision = User.objects.get(pk=user_id).revision
+
+        response = client.post(f"/users/{user_id}/favorites/artists/bulk/", {"ids": ["123", "456"]}, format='json')
+
+        assert (response.data["saved"], response.data["already_saved"], response.data["failed"]) == (1, 1, 0)
+        assert [item["status"] for item in response.data["items"]] == ["already_saved", "saved"]
+        assert User.objects.get(pk=user_id).revision == revision + 1
+
+    def test_bulk_add_requires_items(self, client, created_user):
+        response = client.post(f"/users/{created_user['id']}/favorites/tracks/bulk/", {"names": []}, format='json')
+        assert response.status_code == 400
+
+    def test_bulk_add_rejects_non_object_body(self, client, created_user):
+        response = client.post(f"/users/{created_user['id']}/favorites/tracks/bulk/", ["a", "b"], format='json')
+        assert response.status_code == 400
+
+    def test_bulk_add_limit_comes_from_settings(self, client, created_user, settings):
+        settings.BULK_FAVORITES_MAX_ITEMS = 2
+        response = client.post(f"/users/{created_user['id']}/favorites/tracks/bulk/",
+                               {"names": ["a", "b"], "ids": ["c"]}, format='json')
+        assert response.status_code == 400
+        assert response.data["error"] == "At most 2 items per request"
+
+    @patch("app.spotify.client.get_artists", new_callable=AsyncMock)
+    @patch("app.services.spotify_service.SpotifyService.find_artist_to_save", new_callable=AsyncMock)
+    def test_resolve_keeps_input_order(self, mock_find, mock_get_artists):
+        mock_find.side_effect = lambda user_id, name: None if name == "missing" else MOCK_ARTIST
+        mock_get_artists.return_value = {"artists": [MOCK_ARTIST.model_dump(), None]}
+
+        results = async_to_sync(SpotifyService.resolve_artists_to_save)(1, ["band", "missing"], ["123", "bad"])
+
+        assert [item for item, _ in results] == ["band", "missing", "123", "bad"]
+        assert [dto.id if dto else None for _, dto in results] == ["123", None, "123", None]
+
+    @patch("app.spotify.client.get_tracks", new_callable=AsyncMock)
+    def test_ids_errors_are_reported_per_chunk_and_item(self, mock_get_tracks):
+        # Primer bloque: un elemento sin los campos del DTO. Segundo bloque: 400 de Spotify.
+        request = httpx.Request("GET", "https://api.spotify.com/v1/tracks")
+        bad_request = httpx.HTTPStatusError("400 Bad Request", request=request, response=httpx.Response(400))
+        good = {"id": "t0", "name": "Song", "href": "h", "uri": "u", "duration_ms": 1, "explicit": False,
+                "album": {"name": "Album"}, "artists": [{"id": "a", "name": "A", "href": "h", "uri": "u"}]}
+        mock_get_tracks.side_effect = [{"tracks": [good, {"id": "broken"}] + [None] * 48}, bad_request]
+        ids = [f"t{i}" for i in range(60)]
+
+        results = async_to_sync(SpotifyService.resolve_tracks_to_save)(1, [], ids)
+
+        assert [item for item, _ in results] == ids
+        assert results[0][1].id == "t0"
+        assert isinstance(results[1][1], ValidationError)
+        assert results[2][1] is None
+        assert all(outcome is bad_request for _, outcome in results[50:])
+
+
+def followed_page(ids, after=None):
+    return {"artists": {
+        "items": [{"id": artist_id, "name": f"Artist {artist_id}"} for artist_id in ids],
+        "next": "https://api.spotify.com/v1/me/following?after=x" if after else None,
+        "cursors": {"after": after},
+    }}
+
+
+class TestFollowedArtistsStream:
+
+    @patch("app.spotify.client.get_followed_artists", new_callable=AsyncMock)
+    async def test_streams_every_page_as_json(self, mock_get, api_key):
+        mock_get.side_effect = [followed_page(["a", "b"], after="b"), followed_page(["c"])]
+
+        response = await AsyncClient().get("/spotify/me/following/artists?user_id=1", headers={"x-api-key": api_key})
+        body = b"".join([chunk async for chunk in response.streaming_content])
+
+        assert response.status_code == 200
+        data = json.loads(body)
+        assert data["count"] == 3
+        assert [artist["id"] for artist in data["items"]] == ["a", "b", "c"]
+        assert mock_get.await_args_list[1].kwargs == {"limit": 50, "after": "b"}
+
+    @patch("app.spotify.client.get_followed_artists", new_callable=AsyncMock)
+    async def test_streams_ndjson(self, mock_get, api_key):
+        mock_get.side_effect = [followed_page(["a"], after="a"), followed_page([])]
+
+        response = await AsyncClient().get("/spotify/me/following/artists?user_id=1&output=ndjson",
+                                           headers={"x-api-key": api_key})
+        lines = b"".join([chunk async for chunk in response.streaming_content]).splitlines()
+
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert [json.loads(line)["id"] for line in lines] == ["a"]
+
+    @patch("app.spotify.client.get_followed_artists", new_callable=AsyncMock)
+    async def test_failed_later_page_closes_json_with_error(self, mock_get, api_key):
+        mock_get.side_effect = [followed_page(["a", "b"], after="b"), ExternalAPIError("Spotify", "boom")]
+
+        response = await AsyncClient().get("/spotify/me/following/artists?user_id=1", headers={"x-api-key": api_key})
+        data = json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+
+        assert response.status_code == 200
+        assert [artist["id"] for artist in data["items"]] == ["a", "b"]
+        assert data["count"] == 2
+        assert data["error"] == {"error": "Stream interrupted", "message": "Error communicating with Spotify: boom"}
+
+    @patch("app.spotify.client.get_followed_artists", new_callable=AsyncMock)
+    async def test_failed_later_page_ends_ndjson_with_error_line(self, mock_get, api_key):
+        mock_get.side_effect = [followed_page(["a"], after="a"), {"error": "rate limited"}]
+
+        response = await AsyncClient().get("/spotify/me/following/artists?user_id=1&output=ndjson",
+                                           headers={"x-api-key": api_key})
+        lines = [json.loads(line) for line in
+                 b"".join([chunk async for chunk in response.streaming_content]).splitlines()]
+
+        assert lines[0]["id"] == "a"
+        assert lines[-1] == {"error": "Stream interrupted", "message": "rate limited", "count": 1}
+
+    @patch("app.spotify.client.get_followed_artists", new_callable=AsyncMock)
+    def test_wsgi_streams_later_pages_synchronously(self, mock_get, client):
+        # Bajo WSGI el cuerpo es un iterador síncrono: las páginas se piden a medida que se emiten.
+        mock_get.side_effect = [followed_page(["a"], after="a"), followed_page(["b"], after="b"),
+                                ExternalAPIError("Spotify", "boom")]
+
+        response = client.get("/spotify/me/following/artists?user_id=1&output=ndjson")
+
+        assert not response.is_async
+        assert mock_get.await_count == 1
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        assert [line["id"] for line in lines[:-1]] == ["a", "b"]
+        assert lines[-1] == {"error": "Stream interrupted", "message": "Error communicating with Spotify: boom",
+                             "count": 2}
+
+    @patch("app.spotify.client.get_followed_artists", new_callable=AsyncMock)
+    async def test_missing_token_returns_401_before_streaming(self, mock_get, api_key):
+        mock_get.return_value = {"error": "no_valid_token"}
+
+        response = await AsyncClient().get("/spotify/me/following/artists?user_id=1", headers={"x-api-key": api_key})
+
+        assert response.status_code == 401
+
+
+RAW_TRACK_SEARCH = {"tracks": {"items": [{
+    "id": "t1", "name": "Song", "popularity": 50, "duration_ms": 1000, "explicit": False,
+    "href": "http://api/t1", "uri": "spotify:track:t1", "album": {"name": "Album", "images": []},
+    "artists": [{"id": "a1", "name": "Band", "href": "http://api/a1", "uri": "spotify:artist:a1"}],
+    "available_markets": ["ES", "US"], "external_urls": {"spotify": "https://open.spotify.com/track/t1"},
+}]}}
+
+
+class TestCompactSearch:
+
+    @patch("app.services.spotify_service.SpotifyService.search_tracks_raw", new_callable=AsyncMock)
+    def test_compact_view_uses_default_projection(self, mock_search, client):
+        mock_search.return_value = RAW_TRACK_SEARCH
+
+        response = client.get("/spotify/search/track?user_id=1&q=song&view=compact")
+
+        assert response.status_code == 200
+        item = response.data["items"][0]
+        assert set(item) == {"id", "name", "duration_ms", "explicit", "album_name", "artists", "uri"}
+        assert item["album_name"] == "Album"
+
+    @patch("app.services.spotify_service.SpotifyService.search_artists_raw", new_callable=AsyncMock)
+    def test_fields_projection(self, mock_search, client):
+        mock_search.return_value = {"artists": {"items": [
+            {"id": "a1", "name": "Band", "href": "h", "uri": "u", "images": [{"url": "http://img"}]}
+        ]}}
+
+        response = client.get("/spotify/search/artist?user_id=1&q=band&fields=id,images")
+
+        assert response.data["items"] == [{"id": "a1", "images": [{"url": "http://img", "height": None, "width": None}]}]
+
+    @patch("app.services.spotify_service.SpotifyService.search_artists_raw", new_callable=AsyncMock)
+    def test_unknown_field_is_rejected_before_calling_spotify(self, mock_search, client):
+        response = client.get("/spotify/search/artist?user_id=1&q=band&fields=id,followers")
+
+        assert response.status_code == 400
+        mock_search.assert_not_called()
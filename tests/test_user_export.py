@@ -0,0 +1,119 @@
+import csv
+import json
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+
+from app.api.views.users import _aiter_in_thread, _joined_chunks
+from app.models import User, SavedArtist, SavedTrack
+from app.services.user_export import UserExportService
+
+
+def _make_users():
+    rock = User.objects.create(name="Ana", age=30, music_preferences=["Rock", "Jazz"])
+    punk = User.objects.create(name="Luis", age=40, music_preferences=["Punk Rock"])
+    jazz = User.objects.create(name="Marta", age=50, music_preferences=["jazz"])
+    SavedArtist.objects.create(user=rock, spotify_id="a1", name="Muse")
+    SavedTrack.objects.create(user=rock, spotify_id="t1", name="Uprising")
+    SavedTrack.objects.create(user=jazz, spotify_id="t2", name="So What")
+    return rock, punk, jazz
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+
+class TestUserExportService:
+
+    def test_rows_include_favorites_with_chunked_prefetch(self, django_assert_num_queries):
+        rock, _, jazz = _make_users()
+
+        # Una consulta de usuarios leída por bloques, y artistas + canciones por cada bloque.
+        with django_assert_num_queries(5):
+            rows = list(UserExportService.rows(chunk_size=2))
+
+        assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+        assert rows[0]["favorite_artists"] == [{"spotify_id": "a1", "name": "Muse"}]
+        assert rows[0]["favorite_tracks"] == [{"spotify_id": "t1", "name": "Uprising"}]
+        assert rows[2]["favorite_tracks"] == [{"spotify_id": "t2", "name": "So What"}]
+
+    def test_genre_matches_exactly_case_insensitive(self):
+        rock, punk, jazz = _make_users()
+
+        assert [row["id"] for row in UserExportService.rows(genre="rock")] == [rock.pk]
+        assert [row["id"] for row in UserExportService.rows(genre="JAZZ")] == [rock.pk, jazz.pk]
+
+    def test_id_range(self):
+        rock, punk, jazz = _make_users()
+
+        rows = UserExportService.rows(min_id=punk.pk, max_id=punk.pk)
+
+        assert [row["id"] for row in rows] == [punk.pk]
+
+    def test_csv_round_trips_through_import_format(self):
+        _make_users()
+
+        reader = csv.DictReader(StringIO("".join(UserExportService.lines("csv"))))
+        first = next(reader)
+
+        assert reader.fieldnames == ["id", "name", "age", "music_preferences", "favorite_artists", "favorite_tracks"]
+        assert json.loads(first["music_preferences"]) == ["Rock", "Jazz"]
+        assert json.loads(first["favorite_artists"]) == [{"spotify_id": "a1", "name": "Muse"}]
+
+
+class TestUserExportEndpoint:
+
+    def test_streams_ndjson(self, client):
+        rock, punk, jazz = _make_users()
+
+        response = client.get("/users/export/", {"min_id": punk.pk})
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert [row["id"] for row in _ndjson(response)] == [punk.pk, jazz.pk]
+
+    def test_streams_csv_filtered_by_genre(self, client):
+        rock, _, _ = _make_users()
+
+        response = client.get("/users/export/", {"output": "csv", "genre": "rock"})
+
+        assert response["Content-Type"].startswith("text/csv")
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        assert [int(row["id"]) for row in rows] == [rock.pk]
+
+    def test_rejects_invalid_params(self, client):
+        assert client.get("/users/export/", {"output": "xml"}).status_code == 400
+        assert client.get("/users/export/", {"min_id": "x"}).status_code == 400
+
+    def test_requires_api_key(self, unauthorized_client):
+        assert unauthorized_client.get("/users/export/").status_code == 401
+
+    def test_async_stream_preserves_chunks(self):
+        chunks = _joined_chunks((f"{i}\n" for i in range(5)), 2)
+
+        async def collect():
+            return [chunk async for chunk in _aiter_in_thread(chunks)]
+
+        assert async_to_sync(collect)() == ["0\n1\n", "2\n3\n", "4\n"]
+
+
+class TestExportUsersCommand:
+
+    def test_writes_file(self, tmp_path):
+        rock, punk, jazz = _make_users()
+        target = tmp_path / "users.ndjson"
+
+        call_command("export_users", f"--output={target}", "--genre=jazz")
+
+        rows = [json.loads(line) for line in target.read_text(encoding="utf-8").splitlines()]
+        assert [row["id"] for row in rows] == [rock.pk, jazz.pk]
+
+    def test_writes_stdout(self):
+        _make_users()
+        out = StringIO()
+
+        call_command("export_users", "--format=csv", "--max-id=0", stdout=out)
+
+        assert out.getvalue().strip() == "id,name,age,music_preferences,favorite_artists,favorite_tracks"
@@ -0,0 +1,114 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+from app.models import User
+from app.services.user_import import UserImportService
+
+NDJSON = "\n".join([
+    json.dumps({"name": "  ana lópez ", "age": 30, "music_preferences": [" Rock ", "", "Jazz"]}),
+    json.dumps({"name": "Too Young", "age": 12}),
+    "{not json",
+    "",
+    json.dumps({"name": "   ", "age": 40}),
+    json.dumps({"name": "Luis", "age": "abc"}),
+    json.dumps(["not", "an", "object"]),
+    json.dumps({"name": "Marta", "age": "45"}),
+]) + "\n"
+
+CSV = (
+    "name,age,music_preferences\n"
+    "ana,30,Rock;Jazz\n"
+    'luis,50,"[""Pop""]"\n'
+    "bad,200,\n"
+)
+
+
+def _import(text, fmt, batch_size=None):
+    rejects = []
+    stats = UserImportService.import_rows(
+        UserImportService.read_rows(StringIO(text), fmt), batch_size, rejects.append
+    )
+    return stats, rejects
+
+
+class TestUserImportService:
+
+    def test_ndjson_applies_model_rules_and_reports_rejects(self):
+        stats, rejects = _import(NDJSON, "ndjson")
+
+        assert stats == {"received": 7, "created": 2, "rejected": 5}
+        ana = User.objects.get(name="Ana López")
+        assert ana.music_preferences == ["Rock", "Jazz"]
+        assert ana.revision == 1
+        assert User.objects.get(name="Marta").age == 45
+
+        by_line = {entry["line"]: entry["errors"] for entry in rejects}
+        assert set(by_line) == {2, 3, 5, 6, 7}
+        assert "age" in by_line[2]
+        assert by_line[3]["__all__"][0].startswith("Invalid JSON")
+        assert "name" in by_line[5]
+        assert "age" in by_line[6]
+
+    def test_csv_parses_genres(self):
+        stats, rejects = _import(CSV, "csv")
+
+        assert stats == {"received": 3, "created": 2, "rejected": 1}
+        assert User.objects.get(name="Ana").music_preferences == ["Rock", "Jazz"]
+        assert User.objects.get(name="Luis").music_preferences == ["Pop"]
+        assert rejects[0]["line"] == 4
+        assert rejects[0]["row"]["name"] == "bad"
+
+    def test_inserts_in_batches(self, django_assert_num_queries):
+        text = "".join(json.dumps({"name": f"user {i}", "age": 20 + i}) + "\n" for i in range(5))
+
+        with django_assert_num_queries(3):
+            stats, _ = _import(text, "ndjson", batch_size=2)
+
+        assert stats["created"] == 5
+        assert User.objects.count() == 5
+
+
+class TestUserImportEndpoint:
+
+    def test_imports_ndjson_stream(self, client):
+        response = client.post("/users/import/", NDJSON.encode(), content_type="application/x-ndjson")
+
+        assert response.status_code == 200
+        assert response.data["created"] == 2
+        assert response.data["rejected"] == 5
+        assert len(response.data["rejects"]) == 5
+
+    def test_imports_csv_and_caps_reported_rejects(self, client, settings):
+        settings.USER_IMPORT_MAX_REPORTED_REJECTS = 0
+
+        response = client.post("/users/import/", CSV.encode(), content_type="text/csv; charset=utf-8")
+
+        assert response.status_code == 200
+        assert response.data["rejected"] == 1
+        assert response.data["rejects"] == []
+
+    def test_rejects_unknown_content_type(self, client):
+        response = client.post("/users/import/", {"name": "x"}, format="json")
+        assert response.status_code == 415
+
+    def test_requires_api_key(self, unauthorized_client):
+        response = unauthorized_client.post("/users/import/", b"", content_type="text/csv")
+        assert response.status_code == 401
+
+
+class TestImportUsersCommand:
+
+    def test_writes_rejects_report(self, tmp_path):
+        source = tmp_path / "users.csv"
+        source.write_text(CSV, encoding="utf-8")
+        report = tmp_path / "rejects.ndjson"
+        out = StringIO()
+
+        call_command("import_users", str(source), f"--rejects={report}", stdout=out)
+
+        assert "received=3 created=2 rejected=1" in out.getvalue()
+        lines = report.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["line"] == 4